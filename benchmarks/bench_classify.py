@@ -0,0 +1,85 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Time-of-use classification benchmark
+# Purpose:      Compare the vectorized classification engine against the original per-row apply implementation
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from time_of_use import classify  # noqa: E402
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+night_chg = (11.12 / 100) * 1.15
+peak_chg = (23.32 / 100) * 1.15
+off_peak_chg = (23.32 / 100) * 1.15
+weekend_chg = (11.12 / 100) * 1.15
+
+
+def synthetic_usage(years=5, seed=0):
+    '''
+    Build a synthetic hourly usage series in the same shape as the compiled scraper data
+
+    :param years: Number of years of hourly data to generate
+    :param seed: Seed for the random number generator
+    :returns: pandas DataFrame with timezone aware 'date' and 'usage' string columns
+    '''
+    dates = pd.date_range(start='2021-01-01', periods=years * 8760, freq='h', tz='Pacific/Auckland')
+    usage = np.random.default_rng(seed).gamma(2.0, 0.4, len(dates)).round(2)
+    return pd.DataFrame({'date': dates, 'usage': ['{:.2f} kWh'.format(u) for u in usage]})
+
+
+def legacy_classify(all_data):
+    '''
+    Original per-row implementation from compile_data.py, kept for comparison
+    '''
+    all_data['day'] = all_data['date'].apply(lambda ts: ts.day)
+    all_data['month'] = all_data['date'].apply(lambda ts: ts.month)
+    all_data['year'] = all_data['date'].apply(lambda ts: ts.year)
+    all_data['day_of_year'] = all_data['date'].apply(lambda ts: ts.dayofyear)
+    all_data['night'] = all_data['date'].apply(lambda ts: (ts.hour < 7) or (ts.hour >= 21))
+    all_data['weekend'] = all_data['date'].apply(lambda ts: ts.dayofweek >= 5)
+    all_data['peak'] = all_data['date'].apply(lambda ts: ts.hour in [7, 8, 17, 18, 19, 20])
+    all_data['off-peak'] = all_data['date'].apply(lambda ts: (ts.hour >= 9) and (ts.hour <= 16))
+    all_data['rate'] = 0.0
+    all_data.loc[~all_data['weekend'] & all_data['off-peak'], 'rate'] = off_peak_chg
+    all_data.loc[~all_data['weekend'] & all_data['peak'], 'rate'] = peak_chg
+    all_data.loc[all_data['weekend'] & ~all_data['night'], 'rate'] = weekend_chg
+    all_data.loc[all_data['night'], 'rate'] = night_chg
+    all_data['usage_kWh'] = all_data['usage'].apply(lambda s: float(s[:-4]))
+    all_data['night_kWh'] = 0.0
+    all_data.loc[all_data['night'], 'night_kWh'] = all_data['usage_kWh'].loc[all_data['night']]
+    all_data['weekend_kWh'] = 0.0
+    all_data.loc[all_data['weekend'] & ~all_data['night'], 'weekend_kWh'] = all_data['usage_kWh'].loc[all_data['weekend'] & ~all_data['night']]
+    all_data['peak_kWh'] = 0.0
+    all_data.loc[~all_data['weekend'] & all_data['peak'], 'peak_kWh'] = all_data['usage_kWh'].loc[~all_data['weekend'] & all_data['peak']]
+    all_data['off_peak_kWh'] = 0.0
+    all_data.loc[~all_data['weekend'] & all_data['off-peak'], 'off_peak_kWh'] = all_data['usage_kWh'].loc[~all_data['weekend'] & all_data['off-peak']]
+    all_data['weekday_kWh'] = all_data['off_peak_kWh'] + all_data['peak_kWh']
+    all_data['usage_charge'] = all_data['rate'] * all_data['usage_kWh']
+    return all_data
+
+
+if __name__ == '__main__':
+    data = synthetic_usage()
+    print('Benchmarking classification over {} hourly rows...'.format(len(data)))
+    t0 = time.perf_counter()
+    expected = legacy_classify(data.copy())
+    t_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    result = classify(data.copy(), night_chg=night_chg, weekend_chg=weekend_chg, peak_chg=peak_chg, off_peak_chg=off_peak_chg)
+    t_vector = time.perf_counter() - t0
+    # make sure both implementations agree before reporting any timings
+    pd.testing.assert_frame_equal(result, expected)
+    print('\t{:10.3f}s legacy apply'.format(t_legacy))
+    print('\t{:10.3f}s vectorized'.format(t_vector))
+    print('\t{:10.1f}x speedup'.format(t_legacy / t_vector))
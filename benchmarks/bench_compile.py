@@ -0,0 +1,225 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Compile benchmark
+# Purpose:      Time each stage of full and incremental compiles over synthetic downloads, check they agree and compare runs over time
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import sys
+import argparse
+import filecmp
+import statistics
+import subprocess
+import tempfile
+from functools import partial
+from datetime import datetime
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_data import generate_usage  # noqa: E402
+from ingest import list_usage_files  # noqa: E402
+from time_of_use import PERIODS  # noqa: E402
+from scenarios import DAY_TYPES, scenario_grid  # noqa: E402
+from usage_store import UsageStore  # noqa: E402
+from timing import StageTimer, append_jsonl, read_jsonl  # noqa: E402
+from compile_data import parse_args, compile_usage, write_outputs  # noqa: E402
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmarks_dir)
+# one line per benchmark run, compared against earlier runs with the same settings
+results_filepath = os.path.join(benchmarks_dir, 'bench_compile_results.jsonl')
+# stages compile_data.py times for a full compile, and for an incremental compile through the usage store and rollups
+STAGES = ('ingest', 'localize', 'classify', 'charge allocation', 'scenarios', 'billing index', 'gap detection', 'aggregation', 'billing', 'output')
+INCREMENTAL_STAGES = ('sync', 'read', 'classify', 'charge allocation', 'scenarios', 'billing index', 'gap detection', 'aggregation', 'billing', 'output')
+# every timing recorded for a run - full compile stages, incremental stages after one changed file, and incremental runs as a whole
+TIMINGS = STAGES + ('total',) + tuple('incremental {}'.format(stage) for stage in INCREMENTAL_STAGES) + ('incremental total', 'incremental cold', 'incremental unchanged')
+# reports the incremental compile has to reproduce exactly
+REPORTS = ('daily_totals.csv', 'mthly_totals.csv', 'missing_dates.csv', 'data_gaps.csv')
+# load shifting scenarios priced over the last year of data - 1-20 kWh a day and 0-100% of the source period, between every pair of periods on every day type
+SCENARIOS = scenario_grid(PERIODS, PERIODS, kwh_per_day=range(1, 21), fractions=[f / 10 for f in range(11)], days=tuple(DAY_TYPES))
+SETTINGS = ('years', 'missing_days', 'missing_hours', 'duplicate_hours', 'workers')
+# stages quicker than this are too noisy to call a regression
+MIN_SECONDS = 0.05
+
+
+def run_compile(options, outputs_dir, store_dir, results_dir):
+    '''
+    Run compile_data.py over a downloads folder with some command line options, timing each stage
+
+    The stages are compile_data.py's own, so only printing the summary is left out.
+
+    :param options: List of compile_data.py command line options
+    :param outputs_dir: Folder of daily usage CSVs
+    :param store_dir: Folder of the usage store, kept between incremental runs
+    :param results_dir: Folder to write the output CSVs into
+    :returns: Tuple of (number of hourly rows priced, dict of seconds taken by each stage and the total)
+    '''
+    args = parse_args(options)
+    timer = StageTimer()
+    results = compile_usage(args, outputs_dir, store_dir, timer)
+    write_outputs(results, args, results_dir)
+    timer.lap('output')
+    return len(results['all_data']), timer.as_dict()
+
+
+def write_inputs(input_dir, last_day):
+    '''
+    Write the scenarios and billing periods to compile with - the scenario grid and the 12 calendar months up to the last day of data
+
+    :returns: List of compile_data.py command line options using them
+    '''
+    scenarios_filepath = os.path.join(input_dir, 'scenarios.csv')
+    SCENARIOS.to_csv(scenarios_filepath, index=False)
+    months = pd.date_range(end=last_day, periods=12, freq='MS')
+    periods_filepath = os.path.join(input_dir, 'bill_periods.csv')
+    pd.DataFrame({'start': months.strftime('%d/%m/%Y'), 'end': (months + pd.offsets.MonthEnd()).strftime('%d/%m/%Y')}).to_csv(periods_filepath, index=False)
+    return ['--scenarios', scenarios_filepath, '--bill-periods', periods_filepath]
+
+
+def check_reports(full_dir, incremental_dir, label):
+    '''
+    Check an incremental compile wrote exactly the same reports as a full compile of the same downloads
+
+    :raises AssertionError: Raised when any report differs
+    '''
+    differ = [name for name in REPORTS if not filecmp.cmp(os.path.join(full_dir, name), os.path.join(incremental_dir, name), shallow=False)]
+    assert not differ, 'incremental compile ({}) differs from the full compile in {}'.format(label, ', '.join(differ))
+    print('Incremental compile ({}) matches the full compile'.format(label))
+
+
+def change_day(outputs_dir, position=0.5):
+    '''
+    Rewrite one day's file, changing its first reading and recording its last hour twice
+
+    :param position: Optional fraction of the way through the downloads to pick the day from
+    :returns: Name of the file changed
+    '''
+    files = list_usage_files(outputs_dir)
+    filename = files[int((len(files) - 1) * position)]
+    f_path = os.path.join(outputs_dir, filename)
+    with open(f_path) as f:
+        lines = f.read().splitlines()
+    date, _ = lines[1].split(',')
+    lines[1] = '{},9.99 kWh'.format(date)
+    lines.append(lines[-1])
+    with open(f_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return filename
+
+
+def git_commit():
+    # commit the benchmark ran against, so results can be lined up with changes
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def check_regression(result, tolerance):
+    '''
+    Compare each stage against earlier runs with the same settings
+
+    :param result: Summary of this run, with its settings
+    :param tolerance: Fraction slower than the median of earlier runs that counts as a regression
+    :returns: List of stages that regressed
+    '''
+    earlier = [r for r in read_jsonl(results_filepath) if all(r.get(name) == result[name] for name in SETTINGS)]
+    if not earlier:
+        print('No earlier runs with the same settings to compare against')
+        return []
+    print('Compared with the median of {} earlier runs:'.format(len(earlier)))
+    regressions = []
+    for stage in TIMINGS:
+        values = [r[stage] for r in earlier if stage in r]
+        if not values:
+            continue
+        baseline = statistics.median(values)
+        change = result[stage] / baseline - 1 if baseline else 0.0
+        slower = change > tolerance and result[stage] - baseline > MIN_SECONDS
+        print('\t{:10.3f}s vs {:10.3f}s ({:+7.1%}) {}{}'.format(result[stage], baseline, change, stage, '  REGRESSION' if slower else ''))
+        if slower:
+            regressions.append(stage)
+    return regressions
+
+
+def report_runs(years=None):
+    '''
+    Print the stage timings of earlier runs in the order they ran, to see how they changed over time
+
+    :param years: Optional years of data to show runs for, defaults to all runs
+    :returns: None
+    '''
+    runs = [r for r in read_jsonl(results_filepath) if years is None or r.get('years') == years]
+    if not runs:
+        print('No runs recorded in {}'.format(results_filepath))
+        return
+    columns = STAGES + ('total', 'incremental total', 'incremental unchanged')
+    names = [stage.replace('incremental', 'inc')[:10] for stage in columns]
+    print('{:19s}  {:8s}  {:>5s}  {}'.format('time', 'commit', 'years', '  '.join('{:>10s}'.format(name) for name in names)))
+    for r in runs:
+        print('{:19s}  {:8s}  {:5d}  {}'.format(r['time'][:19], r.get('commit') or '-', r['years'], '  '.join('{:10.3f}'.format(r.get(stage, float('nan'))) for stage in columns)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time each stage of compiling usage data over synthetic downloads')
+    parser.add_argument('--years', type=int, default=5, choices=range(1, 21), metavar='{1-20}', help='number of years of synthetic data to compile')
+    parser.add_argument('--missing-days', type=float, default=0.01, help='fraction of days with no file')
+    parser.add_argument('--missing-hours', type=float, default=0.01, help='fraction of days missing a run of hours')
+    parser.add_argument('--duplicate-hours', type=float, default=0.005, help='fraction of days with a run of hours written twice')
+    parser.add_argument('--workers', type=int, help='number of processes to parse files with, defaults to the number of CPUs')
+    parser.add_argument('--repeat', type=int, default=3, help='number of times to compile the data, keeping the fastest time for each stage')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='fraction slower than earlier runs that fails the benchmark')
+    parser.add_argument('--report', action='store_true', help='print the stage timings of earlier runs with the same years of data and exit')
+    args = parser.parse_args()
+    if args.report:
+        report_runs(args.years)
+        sys.exit(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        outputs_dir = os.path.join(tmp_dir, 'outputs')
+        store_dir = os.path.join(tmp_dir, 'store')
+        full_dir = os.path.join(tmp_dir, 'full')
+        incremental_dir = os.path.join(tmp_dir, 'incremental')
+        os.makedirs(full_dir)
+        os.makedirs(incremental_dir)
+        generated = generate_usage(outputs_dir, years=args.years, missing_days=args.missing_days, missing_hours=args.missing_hours, duplicate_hours=args.duplicate_hours)
+        print('Benchmarking compile over {files} files from {first_day} to {last_day}...'.format(**generated))
+        options = write_inputs(tmp_dir, generated['last_day']) + (['--workers', str(args.workers)] if args.workers else [])
+        full = partial(run_compile, options, outputs_dir, store_dir, full_dir)
+        incremental = partial(run_compile, options + ['--incremental'], outputs_dir, store_dir, incremental_dir)
+        runs = [full() for _ in range(args.repeat)]
+        result = {stage: min(timings[stage] for _, timings in runs) for stage in STAGES + ('total',)}
+        # building the store and rollups from scratch, then a run with nothing new
+        result['incremental cold'] = incremental()[1]['total']
+        check_reports(full_dir, incremental_dir, 'cold')
+        result['incremental unchanged'] = min(incremental()[1]['total'] for _ in range(args.repeat))
+        check_reports(full_dir, incremental_dir, 'unchanged')
+        # one day downloaded again with different data, as after filling a gap
+        print('Changed {}'.format(change_day(outputs_dir)))
+        full()
+        _, changed = incremental()
+        check_reports(full_dir, incremental_dir, 'one changed day')
+        result.update(('incremental {}'.format(stage), seconds) for stage, seconds in changed.items())
+        # another day changed and synced into the store outside the compile, as scrape_data.py does after a scrape
+        print('Changed {} and synced the store'.format(change_day(outputs_dir, position=0.25)))
+        UsageStore(store_dir).sync(outputs_dir, workers=args.workers)
+        full()
+        incremental()
+        check_reports(full_dir, incremental_dir, 'store synced elsewhere')
+    print('Fastest of {} full compiles over {} hourly rows, pricing {} scenarios:'.format(args.repeat, runs[0][0], len(SCENARIOS)))
+    for stage in STAGES + ('total',):
+        print('\t{:10.3f}s {}'.format(result[stage], stage))
+    print('Incremental compile after one changed day:')
+    for stage in INCREMENTAL_STAGES + ('total',):
+        print('\t{:10.3f}s {}'.format(result['incremental {}'.format(stage)], stage))
+    print('\t{:10.3f}s building the store from scratch'.format(result['incremental cold']))
+    print('\t{:10.3f}s with nothing new'.format(result['incremental unchanged']))
+    result.update(years=args.years, missing_days=args.missing_days, missing_hours=args.missing_hours, duplicate_hours=args.duplicate_hours, workers=args.workers, rows=runs[0][0], repeat=args.repeat, commit=git_commit(), time=datetime.now().isoformat())
+    regressions = check_regression(result, args.tolerance)
+    append_jsonl(results_filepath, result)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,103 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Scraper benchmark
+# Purpose:      Time the browser scraper against the local mock portal and catch regressions in days scraped per minute
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import sys
+import argparse
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_portal import start_portal  # noqa: E402
+from ingest import file_date, list_usage_files  # noqa: E402
+from scrape_data import AutoBrowser, start_session, navigate_to_usage, fetch_days  # noqa: E402
+from timing import StepMetrics, append_jsonl, read_jsonl, summarise_steps  # noqa: E402
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+# every step of every benchmark run
+metrics_filepath = os.path.join(benchmarks_dir, 'bench_scrape_metrics.jsonl')
+# one summary line per benchmark run, compared against earlier runs with the same settings
+results_filepath = os.path.join(benchmarks_dir, 'bench_scrape_results.jsonl')
+SESSION_COOKIE = 'sid=bench'
+
+
+def run_benchmark(canned_dir, days, delay=0.5, deep_link=True):
+    '''
+    Scrape some days from a mock portal serving canned data, with a fresh login and empty outputs folder
+
+    :param canned_dir: Folder of daily usage CSVs for the portal to serve
+    :param days: Number of days to scrape, counting back from the latest canned day. The portal's current day, which has no data, is fetched first as well
+    :param delay: Seconds the portal shows its loading screens for
+    :param deep_link: Jump straight to each day with a dated url, rather than stepping back one day at a time
+    :returns: Dict of summary figures for the run, see timing.summarise_steps
+    '''
+    canned = sorted((f_date for f_date in map(file_date, list_usage_files(canned_dir)) if f_date is not None), reverse=True)[:days]
+    # the portal's today is the day after the latest canned day and shows no data, like the real site
+    canned.insert(0, canned[0] + timedelta(days=1))
+    server = start_portal(canned_dir, session_cookie=SESSION_COOKIE, delay=delay)
+    base_url = 'http://localhost:{}'.format(server.server_port)
+    metrics = StepMetrics(metrics_filepath)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # an empty env file so the real credentials are never sent anywhere
+        env_filepath = os.path.join(tmp_dir, '.env')
+        open(env_filepath, 'w').close()
+        browser = AutoBrowser(env_filepath, timeout=20, headless=True, outputs_dir=os.path.join(tmp_dir, 'outputs'), metrics=metrics)
+        # point the browser at the mock portal
+        browser.login_url = '{}/login'.format(base_url)
+        browser.consumption_url = '{}/account/products/consumption?view=hourly'.format(base_url)
+        browser.consumption_date_url = '{}/account/products/consumption?view=hourly&date={{date}}'.format(base_url) if deep_link else None
+        try:
+            start_session(browser, os.path.join(tmp_dir, 'session_cookies.json'), fresh_login=True)
+            navigate_to_usage(browser)
+            fetch_days(browser, canned)
+        finally:
+            browser.driver.quit()
+            server.shutdown()
+    return summarise_steps(metrics_filepath, run=metrics.run_id)
+
+
+def check_regression(result, tolerance):
+    '''
+    Compare days per minute against earlier runs with the same settings
+
+    :param result: Summary of this run, with its settings
+    :param tolerance: Fraction slower than the median of earlier runs that counts as a regression
+    :returns: True if this run was a regression
+    '''
+    settings = ('days', 'delay', 'deep_link')
+    earlier = [r['days_per_minute'] for r in read_jsonl(results_filepath) if all(r.get(name) == result[name] for name in settings) and 'days_per_minute' in r]
+    if not earlier or 'days_per_minute' not in result:
+        print('No earlier runs with the same settings to compare against')
+        return False
+    baseline = statistics.median(earlier)
+    change = result['days_per_minute'] / baseline - 1
+    print('{:.2f} days per minute vs median of {:.2f} over {} earlier runs ({:+.1%})'.format(result['days_per_minute'], baseline, len(earlier), change))
+    if change < -tolerance:
+        print('REGRESSION - more than {:.0%} slower than earlier runs!'.format(tolerance))
+        return True
+    return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the browser scraper against the local mock portal')
+    parser.add_argument('canned_dir', help='folder of daily usage CSVs for the mock portal to serve, e.g. a copy of outputs or one written by generate_data.py')
+    parser.add_argument('--days', type=int, default=30, help='number of days to scrape')
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds the mock portal shows its loading screens for')
+    parser.add_argument('--step', action='store_true', help='step back one day at a time instead of jumping to each day with a dated url')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='fraction slower than earlier runs that fails the benchmark')
+    args = parser.parse_args()
+    result = run_benchmark(args.canned_dir, args.days, delay=args.delay, deep_link=not args.step)
+    result.update(days=args.days, delay=args.delay, deep_link=not args.step, time=datetime.now().isoformat())
+    regression = check_regression(result, args.tolerance)
+    append_jsonl(results_filepath, result)
+    sys.exit(1 if regression else 0)
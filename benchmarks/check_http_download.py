@@ -0,0 +1,68 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         HTTP download check
+# Purpose:      Run the direct HTTP download backend against the local mock portal and check every file comes back intact
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import sys
+import filecmp
+import tempfile
+from datetime import datetime, timedelta
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_data import generate_usage  # noqa: E402
+from mock_portal import start_portal  # noqa: E402
+from http_download import HttpDownloader  # noqa: E402
+from ingest import usage_filename  # noqa: E402
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+SESSION_COOKIE = 'sid=check'
+LAST_DAY = datetime(2026, 10, 15)
+
+
+def check_http_download(days=30):
+    '''
+    Fetch some days from a mock portal serving synthetic data with a cookie shaped like Selenium's driver.get_cookies() gives for localhost
+
+    :param days: Number of days to fetch, counting back from the day after the last day served so one day has no data
+    :returns: None
+    :raises AssertionError: Raised when a download is missing, differs from the served file or an error is not reported
+    '''
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        canned_dir = os.path.join(tmp_dir, 'canned')
+        outputs_dir = os.path.join(tmp_dir, 'outputs')
+        os.makedirs(outputs_dir)
+        generate_usage(canned_dir, years=1, last_day=LAST_DAY.strftime('%Y-%m-%d'))
+        server = start_portal(canned_dir, session_cookie=SESSION_COOKIE)
+        base_url = 'http://localhost:{}'.format(server.server_port)
+        name, value = SESSION_COOKIE.split('=')
+        cookies = [{'name': name, 'value': value, 'domain': 'localhost', 'path': '/', 'secure': False, 'httpOnly': False}]
+        try:
+            # logged in - every day with data is written exactly as served, and the day after the last has none
+            wanted = [LAST_DAY + timedelta(days=1) - timedelta(days=n) for n in range(days)]
+            downloader = HttpDownloader(base_url + '/export?date={date}', outputs_dir, cookies=cookies)
+            fetched, failed = downloader.fetch_range(wanted)
+            assert not failed, 'downloads failed: {}'.format(failed)
+            assert fetched == sorted(wanted[1:]), 'expected {} days, got {}'.format(len(wanted) - 1, len(fetched))
+            for day in fetched:
+                filename = usage_filename(day)
+                assert filecmp.cmp(os.path.join(canned_dir, filename), os.path.join(outputs_dir, filename), shallow=False), 'download differs: {}'.format(filename)
+            # not logged in - the 401 is a failure, not a day without data
+            fetched, failed = HttpDownloader(base_url + '/export?date={date}', outputs_dir).fetch_range(wanted[1:3])
+            assert not fetched and len(failed) == 2, 'unauthorised requests were not reported as failures'
+            # a page that isn't a usage CSV, like the login page after the session expires, is never written out
+            fetched, failed = HttpDownloader(base_url + '/login?date={date}', os.path.join(tmp_dir, 'pages'), cookies=cookies).fetch_range(wanted[1:2])
+            assert not fetched and len(failed) == 1, 'a non CSV response was not reported as a failure'
+        finally:
+            server.shutdown()
+    print('HTTP download check passed for {} days'.format(days))
+
+
+if __name__ == '__main__':
+    check_http_download()
@@ -0,0 +1,119 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Synthetic usage data
+# Purpose:      Write years of realistic daily usage CSVs in the scraper's download format, for benchmarking and testing without the real portal
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingest import TIMEZONE, ordinal, usage_filename  # noqa: E402
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+# share of a day's usage in each hour - low overnight, a morning peak and a bigger evening peak
+HOURLY_SHAPE = np.array([1.0, 0.8, 0.7, 0.7, 0.7, 0.9, 1.4, 2.2, 2.0, 1.3, 1.1, 1.0, 1.1, 1.0, 1.0, 1.1, 1.4, 2.2, 2.8, 2.6, 2.1, 1.7, 1.4, 1.2])
+HOURLY_SHAPE = HOURLY_SHAPE / HOURLY_SHAPE.sum()
+# hour labels as the portal writes them, e.g. 12:00AM, 1:00AM ... 11:00PM
+HOUR_LABELS = np.array(['{}:00{}'.format((hour + 11) % 12 + 1, 'AM' if hour < 12 else 'PM') for hour in range(24)])
+# day of the year usage peaks on - mid winter in NZ
+WINTER_PEAK = 196
+
+
+def generate_usage(outputs_dir, years=1, last_day='2026-10-15', kwh_per_day=20.0, missing_days=0.0, missing_hours=0.0, duplicate_hours=0.0, seed=0):
+    '''
+    Write daily usage CSVs covering some years of hourly data, exactly as the scraper downloads them
+
+    Hours are stepped in absolute time and written as local wall clock times, so daylight savings days have 23 hours
+    (no 2:00AM) or 25 hours (2:00AM twice) like the portal's files. Usage follows a daily shape with morning and evening
+    peaks, higher use in winter and at weekends, and random noise. Gaps and duplicates are never put in daylight savings
+    days, so the repeated hour can still be told apart.
+
+    :param outputs_dir: Folder to write the files into, created if it doesn't exist
+    :param years: Number of years of data to write, counting back from last_day
+    :param last_day: Last day to write a file for
+    :param kwh_per_day: Average daily usage
+    :param missing_days: Optional fraction of days with no file at all
+    :param missing_hours: Optional fraction of days missing a run of 1-6 hours
+    :param duplicate_hours: Optional fraction of days with a run of 1-3 hours written twice
+    :param seed: Seed for the random number generator
+    :returns: Dict with the first and last day and the number of files, rows, missing days, missing hours and duplicated rows written
+    '''
+    rng = np.random.default_rng(seed)
+    last_day = pd.Timestamp(last_day).normalize()
+    first_day = last_day - pd.DateOffset(years=years) + pd.Timedelta(days=1)
+    dates = pd.date_range(start=first_day.tz_localize(TIMEZONE), end=(last_day + pd.Timedelta(hours=23)).tz_localize(TIMEZONE), freq='h')
+    local = dates.tz_localize(None)
+    hour = local.hour.to_numpy()
+    weekend = np.asarray(local.dayofweek >= 5)
+    day_code, days = pd.factorize(local.normalize())
+    hours_per_day = np.bincount(day_code)
+
+    # usage in each hour
+    season = 1.0 + 0.35 * np.cos(2 * np.pi * (local.dayofyear.to_numpy() - WINTER_PEAK) / 365.25)
+    daytime = (hour >= 7) & (hour < 21)
+    usage = kwh_per_day * HOURLY_SHAPE[hour] * season * np.where(weekend & daytime, 1.15, 1.0) * rng.gamma(4.0, 0.25, len(dates))
+    usage = np.round(usage, 2)
+
+    # gaps and duplicates, only on days with the usual 24 hours
+    normal_days = np.flatnonzero(hours_per_day == 24)
+    day_start = np.concatenate([[0], np.cumsum(hours_per_day)[:-1]])
+    copies = np.ones(len(dates), dtype=np.intp)
+    for chance, longest, count in ((missing_hours, 6, 0), (duplicate_hours, 3, 2)):
+        chosen = normal_days[rng.random(len(normal_days)) < chance]
+        lengths = rng.integers(1, longest + 1, len(chosen))
+        first_hours = rng.integers(0, 24 - lengths + 1)
+        for start, length in zip(day_start[chosen] + first_hours, lengths):
+            copies[start:start + length] = count
+    skipped = rng.random(len(days)) < missing_days
+    copies[skipped[day_code]] = 0
+
+    # write one file per day, rows in the portal's format
+    if not os.path.exists(outputs_dir):
+        os.makedirs(outputs_dir)
+    day_labels = np.array(['{} {:%B %Y}'.format(ordinal(day.day), day) for day in days])
+    rows = np.repeat(np.arange(len(dates)), copies)
+    lines = pd.Series(HOUR_LABELS[hour[rows]]) + ' ' + day_labels[day_code[rows]] + ',' + np.char.mod('%.2f kWh', usage[rows])
+    bounds = np.searchsorted(day_code[rows], np.arange(len(days) + 1))
+    for d, day in enumerate(days):
+        if skipped[d]:
+            continue
+        with open(os.path.join(outputs_dir, usage_filename(day)), 'w') as f:
+            f.write('date,usage\n')
+            f.write('\n'.join(lines.iloc[bounds[d]:bounds[d + 1]]))
+            f.write('\n')
+    return {
+        'first_day': first_day.strftime('%Y-%m-%d'),
+        'last_day': last_day.strftime('%Y-%m-%d'),
+        'files': int((~skipped).sum()),
+        'rows': len(rows),
+        'missing_days': int(skipped.sum()),
+        'missing_hours': int((copies[~skipped[day_code]] == 0).sum()),
+        'duplicate_rows': int((copies == 2).sum()),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic daily usage CSVs in the scraper download format')
+    parser.add_argument('--outputs-dir', help='folder to write the files into, defaults to an outputs folder in a new temporary folder')
+    parser.add_argument('--years', type=int, default=1, choices=range(1, 21), metavar='{1-20}', help='number of years of data to write')
+    parser.add_argument('--last-day', default='2026-10-15', help='last day to write a file for, e.g. 2026-10-15')
+    parser.add_argument('--missing-days', type=float, default=0.0, help='fraction of days with no file')
+    parser.add_argument('--missing-hours', type=float, default=0.0, help='fraction of days missing a run of hours')
+    parser.add_argument('--duplicate-hours', type=float, default=0.0, help='fraction of days with a run of hours written twice')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random number generator')
+    args = parser.parse_args()
+    outputs_dir = args.outputs_dir if args.outputs_dir else os.path.join(tempfile.mkdtemp(), 'outputs')
+    summary = generate_usage(outputs_dir, years=args.years, last_day=args.last_day, missing_days=args.missing_days, missing_hours=args.missing_hours, duplicate_hours=args.duplicate_hours, seed=args.seed)
+    print('Wrote {files} files with {rows} rows from {first_day} to {last_day}'.format(**summary))
+    print('\t{missing_days} missing days, {missing_hours} missing hours, {duplicate_rows} duplicated rows'.format(**summary))
+    print(outputs_dir)
@@ -0,0 +1,138 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Billing periods
+# Purpose:      Answer totals and projections for many billing periods at once from prefix sums over the hourly data
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import numpy as np
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from ingest import TIMEZONE
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+BILL_COLUMNS = ['usage_kWh', 'usage_charge', 'daily_charge', 'total_charge', 'weekend_kWh', 'night_kWh', 'weekday_kWh', 'off_peak_kWh', 'peak_kWh']
+SPLITS = ('night', 'weekend', 'weekday', 'off_peak', 'peak')
+HOUR = 3600 * 10**9
+DAY = 24 * HOUR
+
+
+def period_bounds(first_day, last_day, tz=TIMEZONE):
+    '''
+    Get the first and last hourly timestamps of a billing period - the period ends with the 23:00 reading on its last day
+
+    :param first_day: First day of the period, as a date or a dd/mm/yyyy string
+    :param last_day: Last day of the period, as a date or a dd/mm/yyyy string
+    :param tz: Optional timezone of the hourly data
+    :returns: Tuple of timezone aware (start, end) Timestamps
+    '''
+    # first day of billing period includes usage from 23:00-24:00 on the previous day
+    start = pd.Timestamp(pd.to_datetime(first_day, dayfirst=True), tz=tz)
+    # total for last hour of the billing period is at 23:00
+    end = pd.Timestamp(pd.to_datetime(last_day, dayfirst=True) + pd.Timedelta(hours=23), tz=tz)
+    return start, end
+
+
+def read_periods(periods_filepath, tz=TIMEZONE):
+    '''
+    Read billing periods from a CSV file with 'start' and 'end' columns giving the first and last day of each period (dd/mm/yyyy)
+
+    :param periods_filepath: Path to the CSV file
+    :param tz: Optional timezone of the hourly data
+    :returns: List of (start, end) Timestamps, see period_bounds
+    '''
+    periods = pd.read_csv(periods_filepath, dtype=str)
+    return [period_bounds(first_day, last_day, tz=tz) for first_day, last_day in zip(periods['start'], periods['end'])]
+
+
+class BillingIndex(object):
+    '''
+    Prefix sums over the hourly kWh and charge columns, built once so the totals for any billing period are a
+    difference of two rows. An hourly grid of row positions turns each period's bounds into rows by arithmetic rather
+    than by slicing the data, so every period costs the same no matter how long the history is. Days are counted by
+    calendar date, so periods can cross the end of a year.
+
+    :param all_data: Classified hourly data with a timezone aware 'date' column and the charge columns added - must not be empty
+    :param columns: Optional list of columns to total
+    :returns: None
+    '''
+
+    def __init__(self, all_data, columns=BILL_COLUMNS):
+        all_data = all_data.sort_values('date')
+        dates = pd.DatetimeIndex(all_data['date']).as_unit('ns')
+        self.tz = dates.tz
+        self.columns = list(columns)
+        self.ts = dates.asi8
+        # row i of cum is the total of every row before row i
+        values = np.nan_to_num(all_data[self.columns].to_numpy(dtype=float))
+        self.cum = np.zeros((len(values) + 1, len(self.columns)))
+        np.cumsum(values, axis=0, out=self.cum[1:])
+        # wall clock times, so days are counted the same across daylight savings changes
+        self.local_ts = dates.tz_localize(None).asi8
+        # running count of local calendar days - day_of_year repeats every year so can't be used
+        local_days = self.local_ts // DAY
+        self.day_number = np.concatenate([[0], np.cumsum(np.diff(local_days) != 0)])
+        # pos[k] is the number of rows before the k-th hour after the first reading
+        self.t0 = self.ts[0] - self.ts[0] % HOUR
+        hours = (self.ts[-1] - self.t0) // HOUR + 2
+        self.pos = np.searchsorted(self.ts, self.t0 + np.arange(hours) * HOUR, side='left')
+
+    def as_ns(self, timestamps):
+        # nanoseconds since the epoch and wall clock nanoseconds, treating naive timestamps as local time
+        timestamps = pd.DatetimeIndex(timestamps).as_unit('ns')
+        if timestamps.tz is None:
+            timestamps = timestamps.tz_localize(self.tz)
+        return timestamps.asi8, timestamps.tz_convert(self.tz).tz_localize(None).asi8
+
+    def rows(self, starts, ends):
+        '''
+        Find the rows inside each period
+
+        :param starts: Array of period starts as nanoseconds since the epoch
+        :param ends: Array of period ends (inclusive) as nanoseconds since the epoch
+        :returns: Tuple of arrays (first row, one past the last row)
+        '''
+        last_hour = len(self.pos) - 1
+        first = np.clip(-((self.t0 - starts) // HOUR), 0, last_hour)
+        after = np.clip((ends - self.t0) // HOUR + 1, 0, last_hour)
+        lo = self.pos[first]
+        return lo, np.maximum(self.pos[after], lo)
+
+    def query(self, periods, discount=0.0):
+        '''
+        Total usage and charges over many billing periods at once, projecting each one to the end of the period at its average daily rate
+
+        :param periods: List of (start, end) timestamps, see period_bounds
+        :param discount: Optional fractional discount applied to the projected bill
+        :returns: pandas DataFrame with a row per period - its bounds, days_current, days_period, days_remaining, the totals of each column, percentage splits of use, avg_daily_kWh, avg_daily_charge, projected_charge, projected_bill and projected_kWh
+        '''
+        starts, local_starts = self.as_ns([start for start, _ in periods])
+        ends, local_ends = self.as_ns([end for _, end in periods])
+        lo, hi = self.rows(starts, ends)
+        result = pd.DataFrame(self.cum[hi] - self.cum[lo], columns=self.columns)
+        result.insert(0, 'start', pd.to_datetime(starts, utc=True).tz_convert(self.tz))
+        result.insert(1, 'end', pd.to_datetime(ends, utc=True).tz_convert(self.tz))
+        result.insert(2, 'hours', hi - lo)
+        has_data = hi > lo
+        first = np.minimum(lo, len(self.ts) - 1)
+        last = np.maximum(hi - 1, 0)
+        days_with_data = np.where(has_data, self.day_number[last] - self.day_number[first] + 1, 0)
+        span = np.where(has_data, self.local_ts[last] - self.local_ts[first], 0)
+        # data for the latest day ends at 23:00 because no subsequent data is available yet
+        span += np.where(span % DAY // HOUR == 23, HOUR, 0)
+        result.insert(3, 'days_current', span // DAY)
+        result.insert(4, 'days_period', (local_ends - local_starts + HOUR) // DAY)
+        result.insert(5, 'days_remaining', np.maximum(0, result['days_period'] - result['days_current']))
+        for split in SPLITS:
+            result['{}_perc'.format(split)] = 100 * result['{}_kWh'.format(split)] / result['usage_kWh']
+        days_with_data = pd.Series(days_with_data, dtype=float).replace(0, np.nan)
+        result['avg_daily_kWh'] = result['usage_kWh'] / days_with_data
+        result['avg_daily_charge'] = result['total_charge'] / days_with_data
+        result['projected_charge'] = result['total_charge'] + result['avg_daily_charge'] * result['days_remaining']
+        result['projected_bill'] = result['projected_charge'] * (1.0 - discount)
+        result['projected_kWh'] = result['usage_kWh'] + result['avg_daily_kWh'] * result['days_remaining']
+        return result
@@ -0,0 +1,160 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Scrape run checkpoint
+# Purpose:      Record the progress of a scrape run so an interrupted run can resume where it stopped
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import json
+import threading
+from datetime import date, timedelta
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from download_index import as_date
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+# give up retrying a day after it has failed this many times - it stays recorded in the checkpoint
+MAX_ATTEMPTS = 3
+
+
+def compress_days(days):
+    '''
+    Compress a list of days into a list of [first, last] ISO date pairs covering consecutive runs of days
+    '''
+    ranges = []
+    for day in sorted(days):
+        if ranges and day - ranges[-1][1] == timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [[first.isoformat(), last.isoformat()] for first, last in ranges]
+
+
+def expand_days(ranges):
+    '''
+    Expand a list of [first, last] ISO date pairs back into a set of days
+    '''
+    days = set()
+    for first, last in ranges:
+        first, last = date.fromisoformat(first), date.fromisoformat(last)
+        days.update(first + timedelta(days=i) for i in range((last - first).days + 1))
+    return days
+
+
+class RunCheckpoint(object):
+    '''
+    Progress of a scrape run saved to a JSON file after every day, recording the last completed day, the days still
+    outstanding (as date ranges) and the days that failed along with how many times they have been tried. A run can
+    also be flagged to refetch days that were already downloaded, e.g. when filling gaps within days.
+    The checkpoint can be shared between threads.
+
+    :param checkpoint_filepath: Path of the checkpoint file
+    :returns: None
+    '''
+
+    def __init__(self, checkpoint_filepath):
+        self.checkpoint_filepath = checkpoint_filepath
+        self.lock = threading.RLock()
+        self.last_completed = None
+        self.remaining = set()
+        self.failures = {}
+        self.refetch = False
+
+    def load(self):
+        '''
+        Load a saved checkpoint
+
+        :returns: True if there is an unfinished run to resume
+        '''
+        if not os.path.isfile(self.checkpoint_filepath):
+            return False
+        with open(self.checkpoint_filepath) as f:
+            saved = json.load(f)
+        self.last_completed = date.fromisoformat(saved['last_completed']) if saved.get('last_completed') else None
+        self.remaining = expand_days(saved.get('outstanding', []))
+        self.failures = {date.fromisoformat(day): failure for day, failure in saved.get('failures', {}).items()}
+        self.refetch = saved.get('refetch', False)
+        return bool(self.remaining or self.retry_days())
+
+    def save(self):
+        '''
+        Write the checkpoint file
+        '''
+        with self.lock:
+            saved = {
+                'last_completed': self.last_completed.isoformat() if self.last_completed else None,
+                'outstanding': compress_days(self.remaining),
+                'failures': {day.isoformat(): failure for day, failure in sorted(self.failures.items())},
+                'refetch': self.refetch,
+            }
+            with open(self.checkpoint_filepath, 'w') as f:
+                json.dump(saved, f, indent=1)
+
+    def start(self, days, refetch=False):
+        '''
+        Start a new run covering some days, forgetting any previous run
+
+        :param days: Iterable of days to fetch
+        :param refetch: Optional flag to download the days again even if they have already been downloaded
+        :returns: None
+        '''
+        with self.lock:
+            self.last_completed = None
+            self.remaining = set(as_date(day) for day in days)
+            self.failures = {}
+            self.refetch = refetch
+            self.save()
+
+    def outstanding(self):
+        '''
+        Days not yet attempted in this run, newest first
+        '''
+        with self.lock:
+            return sorted(self.remaining, reverse=True)
+
+    def retry_days(self):
+        '''
+        Days that failed but have not used up their attempts, newest first
+        '''
+        with self.lock:
+            return sorted((day for day, failure in self.failures.items() if failure['attempts'] < MAX_ATTEMPTS), reverse=True)
+
+    def complete(self, day):
+        '''
+        Record a day as done, whether or not the portal had data for it
+        '''
+        day = as_date(day)
+        with self.lock:
+            self.remaining.discard(day)
+            self.failures.pop(day, None)
+            self.last_completed = day
+            self.save()
+
+    def fail(self, day, error):
+        '''
+        Record a failed day so it is retried later without blocking the rest of the run
+        '''
+        day = as_date(day)
+        with self.lock:
+            self.remaining.discard(day)
+            attempts = self.failures.get(day, {}).get('attempts', 0) + 1
+            self.failures[day] = {'attempts': attempts, 'error': str(error)}
+            self.save()
+
+    def finish(self):
+        '''
+        Remove the checkpoint file if the run is fully done, otherwise keep it so failed days can be retried later
+
+        :returns: True if the run is fully done
+        '''
+        with self.lock:
+            if self.remaining or self.failures:
+                self.save()
+                return False
+            if os.path.isfile(self.checkpoint_filepath):
+                os.remove(self.checkpoint_filepath)
+            return True
@@ -8,228 +8,424 @@
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # global imports
 import os
+import sys
+import argparse
 import pandas as pd
 from datetime import datetime
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # custom module imports
+from time_of_use import PERIODS, classify
+from ingest import list_usage_files, read_usage_files, localize, parse_and_localize
+from usage_store import UsageStore
+from timing import StageTimer
+from tariffs import load_plans, select_plan, compare_plans
+from billing import BillingIndex, period_bounds, read_periods
+from rollups import RollupStore, daily_rollup, monthly_rollup, monthly_report
+from data_quality import allocate_daily_charge, find_gaps, missing_days, report_gaps
+from scenarios import DAY_TYPES, daily_period_kwh, read_scenarios, scenario_grid, simulate
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # main code
 
-# new Genesis rates from 16th Jan 2024
-# daily_chg = (90 / 100) * 1.15
-# off_peak_chg = (12.18 / 100) * 1.15
-# peak_chg = (24.38 / 100) * 1.15
-# discount = 0.11
-# ------------------------------------------
-
-# Elextric Kiwi Sunday Saver Day/Night Residential Standard => 01/07/2025 - 01/07/2026 = $4406.15 without accounting for free power on Sunday or 1hr free each day
-# # 1 hr free Mon-Sat, free power on Sundays
-# daily_chg = (271.0 / 100) * 1.15
-# night_chg = (23.94 / 100) * 1.15 #9pm-7am everyday
-# peak_chg = (26.59 / 100) * 1.15 #7am-9am, 5pm-9pm
-# off_peak_chg = (23.94 / 100) * 1.15 #9am-5pm
-# weekend_chg = (23.94 / 100) * 1.15 # sat/sun non-night hours
-# discount = 0
-
-# Contact Good Charge => 01/07/2025 - 01/07/2026 = $4142.88 
-# daily_chg = (239.90 / 100) * 1.15
-# night_chg = (15.6 / 100) * 1.15
-# peak_chg = (31.7 / 100) * 1.15
-# off_peak_chg = (31.7 / 100) * 1.15
-# weekend_chg = (31.7 / 100) * 1.15
-# discount = 0.0
-
-# Meridian Freedom => 01/07/2025 - 01/07/2026 = $3839.83 
-# daily_chg = (170.25 / 100) * 1.15
-# night_chg = (19.46 / 100) * 1.15
-# peak_chg = (31.39 / 100) * 1.15
-# off_peak_chg = (31.39 / 100) * 1.15
-# weekend_chg = (19.46 / 100) * 1.15
-# discount = 0.0
-
-# Meridian Night Saver => 01/07/2025 - 01/07/2026 = $3870.77
-# daily_chg = (170.25 / 100) * 1.15
-# night_chg = (19.66 / 100) * 1.15
-# peak_chg = (27.71 / 100) * 1.15
-# off_peak_chg = (27.71 / 100) * 1.15
-# weekend_chg = (27.71 / 100) * 1.15
-# discount = 0.0
-
-# Genesis EVHome => 01/07/2025 - 01/07/2026 = $3650.49
-daily_chg = (184.94 / 100) * 1.15
-night_chg = (14.44 / 100) * 1.15
-peak_chg = (28.91 / 100) * 1.15
-off_peak_chg = (28.91 / 100) * 1.15
-weekend_chg = (28.91 / 100) * 1.15
-discount = 0.0
-
-# new Genesis PowerHome rates (weekend current meter setup) from 1 Sep 2026 => 01/07/2025 - 01/07/2026 = $3737.88
-# daily_chg = (169.30 / 100) * 1.15
-# night_chg = (20.51 / 100) * 1.15
-# peak_chg = (26.95 / 100) * 1.15
-# off_peak_chg = (26.95 / 100) * 1.15
-# weekend_chg = (20.51 / 100) * 1.15
-# discount = 0.0
-
-# new Genesis PowerHome rates (night pricing requiring meter config change) from 1 Sep 2026 => 01/07/2025 - 01/07/2026 = $3586.42
-# daily_chg = (169.30 / 100) * 1.15
-# night_chg = (16.31 / 100) * 1.15
-# peak_chg = (26.95 / 100) * 1.15
-# off_peak_chg = (26.95 / 100) * 1.15
-# weekend_chg = (26.95 / 100) * 1.15
-# discount = 0.0
-
-# genesis fixed 1 year energy plus standard fixed plan (no longer low user) - applies from 19th Jan 2025
-# => 01/07/2025 - 01/07/2026 = $2307.38
-daily_chg = (116.29 / 100) * 1.15
-night_chg = (11.12 / 100) * 1.15 #9pm-7am everyday
-peak_chg = (23.32 / 100) * 1.15 #7am-9am, 5pm-9pm
-off_peak_chg = (23.32 / 100) * 1.15 #9am-5pm
-weekend_chg = (11.12 / 100) * 1.15 # sat/sun non-night hours
-discount = 0.08
-
-# working dir
-working_dir = os.path.dirname(__file__)
-# outputs dir
-outputs_dir = os.path.join(working_dir, 'outputs')
-
-# get all files and compile into single pandas df
-print('Compiling data...')
-all_data = pd.DataFrame()
-for f in os.listdir(outputs_dir):
-    f_path = os.path.join(outputs_dir, f)
-    if os.path.isfile(f_path):
-        # read csv file
-        new_data = pd.read_csv(f_path)
-        new_data['date'] = pd.to_datetime(new_data['date'].str.replace(r'(?<=\d)st|nd|rd|th(?= [a-zA-Z])', '', regex=True), format="%I:%M%p %d %B %Y") #date format like this 12:00AM 6th May 2023
-    all_data = pd.concat([all_data, new_data])
-
-# convert date col into timezone aware
-all_data = all_data.set_index('date').tz_localize(tz='Pacific/Auckland', ambiguous='infer').reset_index()
-# sort by date
-all_data.sort_values('date', inplace=True)
-start_ts = all_data.date.iloc[0]
-end_ts = all_data.date.iloc[-1]
-ts_index = pd.date_range(start=start_ts, end=end_ts, freq='H', name='timestamp')
-# add date parts
-all_data['day'] = all_data['date'].apply(lambda ts: ts.day)
-all_data['month'] = all_data['date'].apply(lambda ts: ts.month)
-all_data['year'] = all_data['date'].apply(lambda ts: ts.year)
-all_data['day_of_year'] = all_data['date'].apply(lambda ts: ts.dayofyear)
-# add column for night 9pm-7am/weekend times
-all_data['night'] = all_data['date'].apply(lambda ts: (ts.hour < 7) or (ts.hour >= 21))
-all_data['weekend'] = all_data['date'].apply(lambda ts: ts.dayofweek >= 5)
-all_data['peak'] = all_data['date'].apply(lambda ts: ts.hour in [7, 8, 17, 18, 19, 20])
-all_data['off-peak'] = all_data['date'].apply(lambda ts: (ts.hour >= 9) and (ts.hour <= 16))
-# add rates
-all_data['rate'] = 0.0
-all_data.loc[~all_data['weekend'] & all_data['off-peak'], 'rate'] = off_peak_chg
-all_data.loc[~all_data['weekend'] & all_data['peak'], 'rate'] = peak_chg
-all_data.loc[all_data['weekend'] & ~all_data['night'], 'rate'] = weekend_chg
-all_data.loc[all_data['night'], 'rate'] = night_chg
-# convert usage in kWh to number
-all_data['usage_kWh'] = all_data['usage'].apply(lambda s: float(s[:-4]))
-# sort out usage at different times
-all_data['night_kWh'] = 0.0
-all_data.loc[all_data['night'], 'night_kWh'] = all_data['usage_kWh'].loc[all_data['night']]
-all_data['weekend_kWh'] = 0.0
-all_data.loc[all_data['weekend'] & ~all_data['night'], 'weekend_kWh'] = all_data['usage_kWh'].loc[all_data['weekend'] & ~all_data['night']]
-all_data['peak_kWh'] = 0.0
-all_data.loc[~all_data['weekend'] & all_data['peak'], 'peak_kWh'] = all_data['usage_kWh'].loc[~all_data['weekend'] & all_data['peak']]
-all_data['off_peak_kWh'] = 0.0
-all_data.loc[~all_data['weekend'] & all_data['off-peak'], 'off_peak_kWh'] = all_data['usage_kWh'].loc[~all_data['weekend'] & all_data['off-peak']]
-all_data['weekday_kWh'] = all_data['off_peak_kWh'] + all_data['peak_kWh']
-# calc charges per day and per kWh
-all_data['usage_charge'] = all_data['rate'] * all_data['usage_kWh']
-# calculate daily charge based on number of hourly timesteps associated with each day - should be 24, but during daylight savings switchover can be 23 or 25
-all_data['daily_charge'] = daily_chg / 24
-num_hrs_table = all_data[['day', 'day_of_year', 'year']].groupby(['year', 'day_of_year']).count()
-dst_num_hrs_table = num_hrs_table.loc[(num_hrs_table != 24).values]
-for (year, day_of_year), num_hrs in dst_num_hrs_table.iterrows():
-    mask = (all_data['year'] == year) & (all_data['day_of_year'] == day_of_year)
-    all_data.loc[mask, 'daily_charge'] = daily_chg / num_hrs.day
-# calc total charge
-all_data['total_charge'] = all_data['usage_charge'] + all_data['daily_charge']
-# add ts index and check for gaps
-all_data = pd.DataFrame(index=ts_index).join(all_data.set_index('date'))
-missing = all_data.loc[all_data.isna().all(axis=1)]
-dups = all_data.loc[all_data.index.duplicated('first') | all_data.index.duplicated('last')]
-# calc total by day and month
-index = ['year', 'month', 'day']
-cols = ['usage_kWh', 'usage_charge', 'daily_charge', 'total_charge', 'weekend_kWh', 'night_kWh', 'weekday_kWh', 'off_peak_kWh', 'peak_kWh']
-daily_totals = all_data.pivot_table(cols, index, aggfunc='sum')
-mthly_totals = daily_totals.groupby(['year', 'month']).sum()
-mthly_totals['days'] = daily_totals.groupby(['year', 'month']).size()
-# add percentages
-mthly_totals['night_perc'] = 100 * mthly_totals['night_kWh'] / mthly_totals['usage_kWh']
-mthly_totals['weekend_perc'] = 100 * mthly_totals['weekend_kWh'] / mthly_totals['usage_kWh']
-mthly_totals['weekday_perc'] = 100 * mthly_totals['weekday_kWh'] / mthly_totals['usage_kWh']
-mthly_totals['off_peak_perc'] = 100 * mthly_totals['off_peak_kWh'] / mthly_totals['usage_kWh']
-mthly_totals['peak_perc'] = 100 * mthly_totals['peak_kWh'] / mthly_totals['usage_kWh']
-# transpose
-mthly_totals = mthly_totals.T
-# add averages
-mthly_totals['avg'] = mthly_totals.mean(axis=1)
-
-# report on missing/duplicated data
-if not missing.empty:
-    print('Missing data for the following timestamps:')
-    for ts, data in missing.iterrows():
-        print('\t{:%Y-%m-%d %H:%M}'.format(ts))
-if not dups.empty:
-    print('Duplicated data for the following timestamps:')
-    for ts, data in dups.iterrows():
-        print('\t{:%Y-%m-%d %H:%M} | {}'.format(ts, data.usage))
-
-# billing period to check - note billing period will end at the end of the day on the last day
-bill_start = pd.Timestamp(pd.to_datetime('30/06/2026', dayfirst=True), tz='Pacific/Auckland') # first day of billing period includes usage from 23:00-24:00 on the previous day
-# bill_start = pd.Timestamp(pd.to_datetime('01/07/2025', dayfirst=True), tz='Pacific/Auckland') # first day of billing period includes usage from 23:00-24:00 on the previous day
-bill_end = pd.Timestamp(pd.to_datetime('29/07/2026', dayfirst=True) + pd.Timedelta(hours=23), tz='Pacific/Auckland') # total for last hour of the billing period is at 23:00
-# bill_end = pd.Timestamp(pd.to_datetime('01/07/2026', dayfirst=True) + pd.Timedelta(hours=23), tz='Pacific/Auckland') # total for last hour of the billing period is at 23:00
-bill_ts = all_data.loc[bill_start:bill_end].index
-bill_days = bill_ts[-1] - bill_ts[0]
-if bill_days.components.hours == 23:
-    # timeseries ends at 23:00 because no subsequent data available
-    bill_days += pd.Timedelta(hours=1)
-days_bill_period = (bill_end - bill_start + pd.Timedelta(hours=1)).days
-days_current = bill_days.days
-days_remaining_bill_period = max(0, days_bill_period - days_current)
-bill_data = all_data.loc[bill_start:bill_end, cols].sum()
-avg_daily_charge = all_data.loc[bill_start:bill_end, ['day_of_year', 'total_charge']].groupby('day_of_year').sum().mean().total_charge
-avg_daily_use =  all_data.loc[bill_start:bill_end, ['day_of_year', 'usage_kWh']].groupby('day_of_year').sum().mean().usage_kWh
-# add percentages
-bill_data['night_perc'] = 100 * bill_data['night_kWh'] / bill_data['usage_kWh']
-bill_data['weekend_perc'] = 100 * bill_data['weekend_kWh'] / bill_data['usage_kWh']
-bill_data['weekday_perc'] = 100 * bill_data['weekday_kWh'] / bill_data['usage_kWh']
-bill_data['off_peak_perc'] = 100 * bill_data['off_peak_kWh'] / bill_data['usage_kWh']
-bill_data['peak_perc'] = 100 * bill_data['peak_kWh'] / bill_data['usage_kWh']
-print('Over billing period from {:%d/%m/%y %H:%M} to {:%d/%m/%y %H:%M}:'.format(bill_start, bill_end))
-print('\t{:8d}/{:2d} days complete'.format(days_current, days_bill_period))
-print('\t{:11d} days remaining'.format(days_remaining_bill_period))
-print('\t{:10.2f}% night use'.format(bill_data['night_perc']))
-print('\t{:10.2f}% weekend use'.format(bill_data['weekend_perc']))
-print('\t{:10.2f}% weekday use'.format(bill_data['weekday_perc']))
-print('\t{:10.2f}% off-peak use'.format(bill_data['off_peak_perc']))
-print('\t{:10.2f}% peak use'.format(bill_data['peak_perc']))
-print('\t{:10.2f}  kWh night use (9pm-7am)'.format(bill_data['night_kWh']))
-print('\t{:10.2f}  kWh weekend use (7am-9pm Sat/Sun)'.format(bill_data['weekend_kWh']))
-print('\t{:10.2f}  kWh weekday use (7am-9pm Mon-Fri)'.format(bill_data['weekday_kWh']))
-print('\t{:10.2f}  kWh off-peak use (9am-5pm Mon-Fri)'.format(bill_data['off_peak_kWh']))
-print('\t{:10.2f}  kWh peak use (7am-9am & 5pm-9pm Mon-Fri)'.format(bill_data['peak_kWh']))
-print('\t{:10.2f}  kWh total use'.format(bill_data['usage_kWh']))
-print('\t{:10.2f}  kWh avg daily use'.format(avg_daily_use))
-print('\t{:10.2f}  NZD charged for usage'.format(bill_data['usage_charge']))
-print('\t{:10.2f}  NZD charged for metering'.format(bill_data['daily_charge']))
-print('\t{:10.2f}  NZD charged total'.format(bill_data['total_charge']))
-print('\t{:10.2f}  NZD average daily charge over bill period'.format(avg_daily_charge))
-print('\t{:10.2f}  NZD total charges'.format(avg_daily_charge*days_remaining_bill_period + bill_data['total_charge']))
-print('\t{:10.2f}  NZD estimated bill (discounted)'.format((avg_daily_charge*days_remaining_bill_period + bill_data['total_charge']) * (1.0 - discount)))
-print('\t{:10.2f}  kWh estimated total use'.format(bill_data['usage_kWh'] + avg_daily_use*days_remaining_bill_period))
-
-# write output CSV
-mthly_totals.to_csv('mthly_totals.csv')
-daily_totals.to_csv('daily_totals.csv')
-all_data.to_csv('all_data.csv')
-print('Wrote compiled data csv files!')
-
-print('DONE!')
+
+def meter_source(value):
+    '''
+    Parse a --meter option like 'home=outputs' into a (meter id, absolute folder path) tuple
+    '''
+    meter, sep, folder = value.partition('=')
+    if not (meter and sep and folder):
+        raise argparse.ArgumentTypeError('expected METER=FOLDER, got {}'.format(value))
+    return meter, os.path.abspath(folder)
+
+
+def months_needed(held, changed_months, periods=(), recent=False):
+    '''
+    Work out which months of the usage store an incremental run with current rollups has to read and price
+
+    :param held: Sorted list of (year, month) tuples in the store
+    :param changed_months: List of (year, month) tuples that changed, to update the rollups with
+    :param periods: Optional list of (start, end) timestamps of billing periods to report on
+    :param recent: Optional flag to include the last 365 days of data, e.g. for plan comparisons
+    :returns: Sorted list of (year, month) tuples - always includes the latest month
+    '''
+    months = set(changed_months).union(held[-1:])
+    for start, end in periods:
+        months.update(p for p in held if (start.year, start.month) <= p <= (end.year, end.month))
+    if recent:
+        # 365 days touch at most 13 calendar months
+        months.update(held[-13:])
+    return sorted(months)
+
+
+def parse_args(argv=None):
+    '''
+    Parse command line options
+
+    :param argv: Optional list of options to parse instead of the command line, e.g. from the benchmarks
+    :returns: argparse Namespace of options
+    '''
+    parser = argparse.ArgumentParser(description='Compile scraped data and do analysis on hourly usage')
+    parser.add_argument('--incremental', action='store_true', help='only parse new or changed files in outputs, reading the rest from the columnar usage store')
+    parser.add_argument('--all-data', action='store_true', help='write all_data.csv on incremental runs too - otherwise the usage store holds the hourly data and only full compiles write it')
+    parser.add_argument('--meter', type=meter_source, action='append', metavar='METER=FOLDER', help='compile the downloads in FOLDER as meter METER instead of outputs - repeat for each meter or account to compile them together')
+    parser.add_argument('--files', nargs='+', help='only compile these file names from outputs, or from each --meter folder that has them')
+    parser.add_argument('--start', type=pd.to_datetime, help='only compile files for days on or after this date, e.g. 2025-07-01')
+    parser.add_argument('--end', type=pd.to_datetime, help='only compile files for days on or before this date, e.g. 2026-07-01')
+    parser.add_argument('--workers', type=int, help='number of processes to parse files with, defaults to the number of CPUs')
+    parser.add_argument('--timings', action='store_true', help='print how long each stage took')
+    parser.add_argument('--plans-file', help='JSON file of plan definitions, defaults to plans.json next to this script')
+    parser.add_argument('--plan', help='name of the plan to price usage with, defaults to the current plan in the plans file')
+    parser.add_argument('--compare', action='store_true', help='price usage against every plan and write a ranked plan_comparison.csv')
+    parser.add_argument('--bill-start', default='30/06/2026', help='first day of the billing period (dd/mm/yyyy)')
+    parser.add_argument('--bill-end', default='29/07/2026', help='last day of the billing period (dd/mm/yyyy)')
+    parser.add_argument('--scenarios', help='CSV file of load shifting scenarios (name, source, target, kwh_per_day, fraction, days) to price over the last 365 days of data, written to scenario_results.csv')
+    parser.add_argument('--scenario-grid', type=int, metavar='MAX_KWH', help='also price moving 1 to MAX_KWH kWh a day between every pair of tariff periods on all days, weekdays and weekends, e.g. to size EV charging')
+    parser.add_argument('--bill-periods', help='CSV file of billing periods with start and end columns (dd/mm/yyyy) to total and project, written to billing_periods.csv')
+    args = parser.parse_args(argv)
+    if args.meter:
+        # each meter's rows are labelled by the folder they came from, so meters can't share an id or a folder
+        meters = [meter for meter, _ in args.meter]
+        folders = [os.path.normcase(os.path.realpath(folder)) for _, folder in args.meter]
+        if len(set(meters)) < len(meters):
+            parser.error('--meter ids must be unique, got {}'.format(', '.join(meters)))
+        if len(set(folders)) < len(folders):
+            parser.error('--meter folders must be different for each meter, got {}'.format(', '.join(folder for _, folder in args.meter)))
+        missing = [folder for _, folder in args.meter if not os.path.isdir(folder)]
+        if missing:
+            parser.error('--meter folders not found: {}'.format(', '.join(missing)))
+    if args.scenario_grid is not None and args.scenario_grid < 1:
+        parser.error('--scenario-grid must be at least 1 kWh, got {}'.format(args.scenario_grid))
+    return args
+
+
+def read_downloads(outputs_dir, timer, files=None, start=None, end=None, workers=None):
+    '''
+    Parse a folder of downloaded files - the ingest and localize stages of a full compile
+
+    :param outputs_dir: Folder of downloaded daily usage CSVs
+    :param timer: StageTimer to record the stages with
+    :param files: Optional list of file names to compile, defaults to every file
+    :param start: Optional first day of files to compile
+    :param end: Optional last day of files to compile
+    :param workers: Optional number of processes to parse files with
+    :returns: pandas DataFrame of hourly usage with timezone aware timestamps
+    '''
+    files = files if files else list_usage_files(outputs_dir, start=start, end=end)
+    all_data = read_usage_files(outputs_dir, files, workers=workers)
+    timer.lap('ingest')
+    # convert date col into timezone aware
+    all_data = localize(all_data)
+    timer.lap('localize')
+    return all_data
+
+
+def read_meters(sources, store_dir, timer, incremental=False, files=None, start=None, end=None, workers=None):
+    '''
+    Parse the downloads of several meters into one set of hourly usage - the ingest stage of a multi-meter compile
+
+    :param sources: Dict mapping each meter id to the folder of its downloads
+    :param store_dir: Folder to keep each meter's usage store in, for incremental compiles
+    :param timer: StageTimer to record the stage with
+    :param incremental: Optional flag to sync and read each meter's usage store instead of parsing every file
+    :param files: Optional list of file names to compile from the folders that have them
+    :param start: Optional first day of files to compile
+    :param end: Optional last day of files to compile
+    :param workers: Optional number of processes to parse files with
+    :returns: pandas DataFrame of hourly usage with timezone aware timestamps and a 'meter' column
+    '''
+    print('Compiling {} meters: {}'.format(len(sources), ', '.join(sources)))
+    if incremental:
+        # a store per meter, read back and combined
+        frames = []
+        for meter, meter_dir in sources.items():
+            store = UsageStore(os.path.join(store_dir, 'meter={}'.format(meter)))
+            store.sync(meter_dir, workers=workers)
+            meter_data = store.read(start=start, end=end, columns=['date', 'usage_kWh', 'source'])
+            if files:
+                meter_data = meter_data.loc[meter_data['source'].isin(files)]
+            if meter_data.empty:
+                print('No usage data for meter {} in {}'.format(meter, meter_dir))
+                continue
+            frames.append(meter_data.drop(columns='source').assign(meter=meter))
+        if not frames:
+            sys.exit('No usage data found for any meter!')
+        all_data = pd.concat(frames, ignore_index=True)
+    else:
+        # parse every meter's files in one pool - files are localized one at a time so readings from different meters don't get mixed up
+        f_paths = {}
+        for meter, meter_dir in sources.items():
+            # named files are only compiled for the meters that have them
+            meter_files = [f for f in files if os.path.isfile(os.path.join(meter_dir, f))] if files else list_usage_files(meter_dir, start=start, end=end)
+            if not meter_files:
+                print('No usage files for meter {} in {}'.format(meter, meter_dir))
+            f_paths.update((os.path.join(meter_dir, f), meter) for f in meter_files)
+        if not f_paths:
+            sys.exit('No usage files found for any meter!')
+        # the paths are absolute, so they don't need a folder
+        all_data = read_usage_files('', list(f_paths), workers=workers, parser=parse_and_localize, source=True)
+        all_data['meter'] = all_data.pop('source').map(f_paths)
+    timer.lap('ingest')
+    return all_data
+
+
+def read_store(store, outputs_dir, plan, timer, rollups=None, files=None, start=None, end=None, periods=(), recent=False, workers=None):
+    '''
+    Bring the usage store up to date with the downloads and read back the hourly data a run needs - the sync and read stages of an incremental compile
+
+    :param store: UsageStore to sync and read
+    :param outputs_dir: Folder of downloaded daily usage CSVs
+    :param plan: Plan dict usage is priced with
+    :param timer: StageTimer to record the stages with
+    :param rollups: Optional RollupStore kept with the store. When its rollups are current only the months that changed since they were saved and the months the reports need are read
+    :param files: Optional list of file names to compile
+    :param start: Optional first day to compile
+    :param end: Optional last day to compile
+    :param periods: Optional list of (start, end) timestamps of billing periods to report on
+    :param recent: Optional flag to read the last 365 days of data, e.g. for plan comparisons
+    :param workers: Optional number of processes to parse files with
+    :returns: Tuple of (hourly usage, timestamps of every hour held to check for gaps, or None when they are all in the hourly usage)
+    '''
+    # only parse files that are new or have changed since the last run
+    store.sync(outputs_dir, workers=workers)
+    timer.lap('sync')
+    gap_dates = None
+    if rollups is not None and rollups.current(plan):
+        # the saved rollups hold the totals, so only the changed months and those the reports need are read and priced
+        held = store.partitions()
+        months = months_needed(held, rollups.stale_months(store.versions()), periods, recent=recent)
+        print('Reading {} of {} months from the store...'.format(len(months), len(held)))
+        all_data = store.read(months=months, columns=['date', 'usage_kWh'])
+        # gaps are still checked over every hour held, which only needs the timestamps
+        gap_dates = store.read(columns=['date'])['date']
+    else:
+        all_data = store.read(start=start, end=end, columns=['date', 'usage_kWh', 'source'])
+        if files:
+            all_data = all_data.loc[all_data['source'].isin(files)]
+        all_data = all_data.drop(columns='source')
+    timer.lap('read')
+    return all_data, gap_dates
+
+
+def price_usage(all_data, plan, timer, by_meter=False):
+    '''
+    Classify hourly usage into tariff periods and add the charges of a plan - the classify and charge allocation stages
+
+    :param all_data: pandas DataFrame of hourly usage with timezone aware timestamps
+    :param plan: Plan dict to price usage with
+    :param timer: StageTimer to record the stages with
+    :param by_meter: Optional flag to allocate daily charges to each meter separately
+    :returns: pandas DataFrame of hourly usage sorted by date, with periods, kWh buckets and usage, daily and total charges added
+    '''
+    # sort by date
+    all_data = all_data.sort_values(['meter', 'date'] if by_meter else 'date')
+    # classify hours into tariff periods, add rates, kWh buckets and usage charges
+    all_data = classify(all_data, night_chg=plan['night_chg'], weekend_chg=plan['weekend_chg'], peak_chg=plan['peak_chg'], off_peak_chg=plan['off_peak_chg'])
+    timer.lap('classify')
+    # calculate daily charge based on number of hourly timesteps associated with each day - should be 24, but during daylight savings switchover can be 23 or 25
+    all_data = allocate_daily_charge(all_data, plan['daily_chg'], keys=('meter', 'year', 'month', 'day') if by_meter else ('year', 'month', 'day'))
+    # calc total charge
+    all_data['total_charge'] = all_data['usage_charge'] + all_data['daily_charge']
+    timer.lap('charge allocation')
+    return all_data
+
+
+def compile_usage(args, outputs_dir, store_dir, timer):
+    '''
+    Compile downloaded usage and work out the totals and reports asked for - everything main does apart from printing the summary and writing the output CSVs
+
+    :param args: Command line options, see parse_args
+    :param outputs_dir: Folder of downloaded daily usage CSVs
+    :param store_dir: Folder of the usage store for incremental compiles
+    :param timer: StageTimer to record each stage with
+    :returns: Dict of results for print_summary and write_outputs
+    '''
+    # plan to price usage with
+    plans, current_plan = load_plans(args.plans_file if args.plans_file else os.path.join(os.path.dirname(__file__), 'plans.json'))
+    plan = select_plan(plans, args.plan if args.plan else current_plan)
+    print('Pricing usage with plan {}'.format(plan['name']))
+    # billing period to check - note billing period will end at the end of the day on the last day
+    bill_start, bill_end = period_bounds(args.bill_start, args.bill_end)
+    # more billing periods to total and project
+    periods = read_periods(args.bill_periods) if args.bill_periods else []
+    results = {'plan': plan, 'bill_start': bill_start, 'bill_end': bill_end}
+
+    # get all files and compile into single pandas df
+    print('Compiling data...')
+    store = None
+    rollups = None
+    # timestamps to check for gaps, when they are not all in all_data
+    gap_dates = None
+    if args.meter:
+        # several meters - the rest of the pipeline runs once over all of them, grouping by meter where needed
+        all_data = read_meters(dict(args.meter), store_dir, timer, incremental=args.incremental, files=args.files, start=args.start, end=args.end, workers=args.workers)
+    elif args.incremental:
+        store = UsageStore(store_dir)
+        if not (args.files or args.start is not None or args.end is not None or args.all_data):
+            # daily and monthly totals only need updating for the months that changed since they were saved - by this run's sync or any other
+            rollups = RollupStore(os.path.join(store_dir, 'rollups'))
+        all_data, gap_dates = read_store(store, outputs_dir, plan, timer, rollups=rollups, files=args.files, start=args.start, end=args.end, periods=[(bill_start, bill_end)] + periods, recent=bool(args.compare or args.scenarios or args.scenario_grid), workers=args.workers)
+    else:
+        all_data = read_downloads(outputs_dir, timer, files=args.files, start=args.start, end=args.end, workers=args.workers)
+    all_data = price_usage(all_data, plan, timer, by_meter=bool(args.meter))
+    results['all_data'] = all_data
+    if args.compare:
+        # price the same usage against every plan - annual cost is over the last 365 days of data
+        annual_end = all_data['date'].max()
+        annual_start = (annual_end - pd.Timedelta(days=364)).normalize()
+        results['comparison'] = compare_plans(all_data, plans, {'annual': (annual_start, annual_end), 'billing': (bill_start, bill_end)})
+        results['annual'] = (annual_start, annual_end)
+        timer.lap('plan comparison')
+    if args.scenarios or args.scenario_grid:
+        # what if usage was moved into cheaper periods - priced over the last 365 days of data
+        scenario_end = all_data['date'].max()
+        scenario_start = (scenario_end - pd.Timedelta(days=364)).normalize()
+        kwh, weekend = daily_period_kwh(all_data, start=scenario_start, end=scenario_end)
+        scenarios = [read_scenarios(args.scenarios)] if args.scenarios else []
+        if args.scenario_grid:
+            scenarios.append(scenario_grid(PERIODS, PERIODS, kwh_per_day=range(1, args.scenario_grid + 1), days=tuple(DAY_TYPES)))
+        results['scenario_results'] = simulate(kwh, weekend, pd.concat(scenarios, ignore_index=True), plan)
+        results['scenario_range'] = (scenario_start, scenario_end)
+        timer.lap('scenarios')
+    # prefix sums for totalling any number of billing periods
+    billing = BillingIndex(all_data)
+    meter_billing = {meter: BillingIndex(meter_data) for meter, meter_data in all_data.groupby('meter')} if args.meter else {}
+    timer.lap('billing index')
+    # check for missing and duplicated hours
+    results['gaps'], results['dups'] = find_gaps(all_data['date'] if gap_dates is None else gap_dates, meters=all_data['meter'] if args.meter else None)
+    timer.lap('gap detection')
+    # calc total by day and month, with percentages
+    if rollups is not None:
+        versions = store.versions()
+        daily_totals, mthly_totals = rollups.update(all_data, rollups.stale_months(versions), plan, versions)
+    else:
+        daily_totals = daily_rollup(all_data)
+        mthly_totals = monthly_rollup(daily_totals)
+    results['daily_totals'] = daily_totals
+    # transpose and add averages
+    results['mthly_totals'] = monthly_report(mthly_totals)
+    if args.meter:
+        # the same totals for each meter
+        results['meter_daily_totals'] = daily_rollup(all_data, by=('meter',))
+        results['meter_mthly_totals'] = monthly_rollup(results['meter_daily_totals'], by=('meter',))
+    timer.lap('aggregation')
+
+    results['bill_data'] = billing.query([(bill_start, bill_end)], discount=plan['discount']).iloc[0]
+    results['meter_bills'] = {meter: index.query([(bill_start, bill_end)], discount=plan['discount']).iloc[0] for meter, index in meter_billing.items()}
+    if args.bill_periods:
+        # every billing period in the file in one pass - for all meters together, then each meter
+        bill_periods = billing.query(periods, discount=plan['discount'])
+        if meter_billing:
+            bill_periods = pd.concat([bill_periods.assign(meter='all')] + [index.query(periods, discount=plan['discount']).assign(meter=meter) for meter, index in meter_billing.items()], ignore_index=True)
+        results['bill_periods'] = bill_periods
+    timer.lap('billing')
+    return results
+
+
+def print_summary(results):
+    '''
+    Print the data quality report, the billing period summary and any plan comparison and scenarios
+
+    :param results: Dict of results from compile_usage
+    :returns: None
+    '''
+    # report on missing/duplicated data
+    report_gaps(results['gaps'], results['dups'])
+
+    bill_data = results['bill_data']
+    print('Over billing period from {:%d/%m/%y %H:%M} to {:%d/%m/%y %H:%M}:'.format(results['bill_start'], results['bill_end']))
+    print('\t{:8d}/{:2d} days complete'.format(bill_data['days_current'], bill_data['days_period']))
+    print('\t{:11d} days remaining'.format(bill_data['days_remaining']))
+    print('\t{:10.2f}% night use'.format(bill_data['night_perc']))
+    print('\t{:10.2f}% weekend use'.format(bill_data['weekend_perc']))
+    print('\t{:10.2f}% weekday use'.format(bill_data['weekday_perc']))
+    print('\t{:10.2f}% off-peak use'.format(bill_data['off_peak_perc']))
+    print('\t{:10.2f}% peak use'.format(bill_data['peak_perc']))
+    print('\t{:10.2f}  kWh night use (9pm-7am)'.format(bill_data['night_kWh']))
+    print('\t{:10.2f}  kWh weekend use (7am-9pm Sat/Sun)'.format(bill_data['weekend_kWh']))
+    print('\t{:10.2f}  kWh weekday use (7am-9pm Mon-Fri)'.format(bill_data['weekday_kWh']))
+    print('\t{:10.2f}  kWh off-peak use (9am-5pm Mon-Fri)'.format(bill_data['off_peak_kWh']))
+    print('\t{:10.2f}  kWh peak use (7am-9am & 5pm-9pm Mon-Fri)'.format(bill_data['peak_kWh']))
+    print('\t{:10.2f}  kWh total use'.format(bill_data['usage_kWh']))
+    print('\t{:10.2f}  kWh avg daily use'.format(bill_data['avg_daily_kWh']))
+    print('\t{:10.2f}  NZD charged for usage'.format(bill_data['usage_charge']))
+    print('\t{:10.2f}  NZD charged for metering'.format(bill_data['daily_charge']))
+    print('\t{:10.2f}  NZD charged total'.format(bill_data['total_charge']))
+    print('\t{:10.2f}  NZD average daily charge over bill period'.format(bill_data['avg_daily_charge']))
+    print('\t{:10.2f}  NZD total charges'.format(bill_data['projected_charge']))
+    print('\t{:10.2f}  NZD estimated bill (discounted)'.format(bill_data['projected_bill']))
+    print('\t{:10.2f}  kWh estimated total use'.format(bill_data['projected_kWh']))
+    if results['meter_bills']:
+        print('By meter:')
+        for meter, meter_bill in results['meter_bills'].items():
+            print('\t{:10.2f}  kWh {:10.2f}  NZD charged {:10.2f}  NZD estimated bill  {}'.format(meter_bill['usage_kWh'], meter_bill['total_charge'], meter_bill['projected_bill'], meter))
+
+    if 'comparison' in results:
+        print('Plans ranked by estimated bill (discounted) from {:%d/%m/%y} to {:%d/%m/%y} and over billing period:'.format(*results['annual']))
+        for name, costs in results['comparison'].iterrows():
+            print('\t{:10.2f}  {:10.2f}  NZD {}'.format(costs['annual_bill'], costs['billing_bill'], name))
+
+    if 'scenario_results' in results:
+        scenario_results = results['scenario_results']
+        print('Best of {} load shifting scenarios from {:%d/%m/%y} to {:%d/%m/%y}:'.format(len(scenario_results), *results['scenario_range']))
+        for _, result in scenario_results.nlargest(5, 'saving').iterrows():
+            print('\t{:10.2f}  NZD saved moving {:8.1f} kWh  {}'.format(result['saving'], result['moved_kWh'], result['name']))
+
+
+def write_outputs(results, args, results_dir):
+    '''
+    Write the output CSVs - the output stage
+
+    :param results: Dict of results from compile_usage
+    :param args: Command line options, see parse_args
+    :param results_dir: Folder to write the CSVs into
+    :returns: None
+    '''
+    def out_path(filename):
+        return os.path.join(results_dir, filename)
+
+    results['mthly_totals'].to_csv(out_path('mthly_totals.csv'))
+    results['daily_totals'].to_csv(out_path('daily_totals.csv'))
+    if args.all_data or not args.incremental:
+        results['all_data'].set_index('date').rename_axis('timestamp').to_csv(out_path('all_data.csv'))
+    gaps, dups = results['gaps'], results['dups']
+    # days with missing hours, for scrape_data.py --gap-fill
+    if args.meter:
+        missing = [pd.DataFrame({'meter': meter, 'date': missing_days(meter_gaps)}) for meter, meter_gaps in gaps.groupby('meter')]
+        (pd.concat(missing, ignore_index=True) if missing else pd.DataFrame(columns=['meter', 'date'])).to_csv(out_path('missing_dates.csv'), index=False)
+        results['meter_mthly_totals'].to_csv(out_path('mthly_totals_by_meter.csv'))
+        results['meter_daily_totals'].to_csv(out_path('daily_totals_by_meter.csv'))
+    else:
+        pd.DataFrame({'date': missing_days(gaps)}).to_csv(out_path('missing_dates.csv'), index=False)
+    pd.concat([gaps.assign(kind='missing'), dups.assign(kind='duplicated')], ignore_index=True).astype({'extra_rows': 'Int64'}).to_csv(out_path('data_gaps.csv'), index=False)
+    if 'comparison' in results:
+        results['comparison'].to_csv(out_path('plan_comparison.csv'))
+    if 'scenario_results' in results:
+        results['scenario_results'].to_csv(out_path('scenario_results.csv'), index=False)
+    if 'bill_periods' in results:
+        results['bill_periods'].to_csv(out_path('billing_periods.csv'), index=False)
+    print('Wrote compiled data csv files!')
+
+
+def main():
+    # working dir
+    working_dir = os.path.dirname(__file__)
+    # outputs dir
+    outputs_dir = os.path.join(working_dir, 'outputs')
+    # columnar usage store dir for incremental compiles
+    store_dir = os.path.join(working_dir, 'store')
+
+    # command line options
+    args = parse_args()
+    timer = StageTimer()
+    results = compile_usage(args, outputs_dir, store_dir, timer)
+    print_summary(results)
+    # write output CSV
+    write_outputs(results, args, os.getcwd())
+    timer.lap('output')
+    if args.timings:
+        timer.report()
+
+    print('DONE!')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Data quality
+# Purpose:      Spread the daily charge over each day's hours and find missing or duplicated hours in the compiled data
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import numpy as np
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from billing import HOUR
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+DAY_KEYS = ('year', 'month', 'day')
+
+
+def allocate_daily_charge(all_data, daily_chg, keys=DAY_KEYS):
+    '''
+    Spread the daily charge evenly over the hours recorded for each day - usually 24, but 23 or 25 on daylight savings changes
+
+    :param all_data: Classified hourly data with the date part columns added
+    :param daily_chg: Daily charge in NZD
+    :param keys: Optional columns identifying a day, e.g. with a meter column in front for several meters
+    :returns: The same DataFrame with a 'daily_charge' column added
+    '''
+    hours = all_data.groupby(list(keys), sort=False)['date'].transform('size')
+    all_data['daily_charge'] = daily_chg / hours.to_numpy()
+    return all_data
+
+
+def to_timestamps(ns, tz):
+    # nanoseconds since the epoch back to timezone aware timestamps
+    return pd.to_datetime(ns, utc=True).tz_convert(tz)
+
+
+def find_gaps(dates, meters=None):
+    '''
+    Find missing and duplicated hours with one pass over the sorted timestamps, as ranges of consecutive hours
+
+    :param dates: Timezone aware timestamps of the hourly readings, in any order
+    :param meters: Optional meter id of each reading - gaps and duplicates are then found within each meter's readings
+    :returns: Tuple of DataFrames (gaps, dups). Gaps have start, end and hours columns for each run of missing hours.
+              Dups have start, end, hours and extra_rows columns for each run of hours recorded more than once. Both
+              have a meter column in front when meters are given
+    '''
+    dates = pd.DatetimeIndex(dates).as_unit('ns')
+    ns = dates.asi8
+    if meters is None:
+        codes = np.zeros(len(ns), dtype=np.intp)
+        names = np.array([None])
+    else:
+        codes, names = pd.factorize(np.asarray(meters))
+    order = np.lexsort((ns, codes))
+    ns = ns[order]
+    codes = codes[order]
+    step = np.diff(ns)
+    same_meter = codes[1:] == codes[:-1]
+    # a step of more than an hour is a gap between two readings
+    g = np.flatnonzero(same_meter & (step > HOUR))
+    gaps = pd.DataFrame({'start': to_timestamps(ns[g] + HOUR, dates.tz), 'end': to_timestamps(ns[g + 1] - HOUR, dates.tz), 'hours': step[g] // HOUR - 1})
+    # a step of zero is an extra reading for an hour - count them by hour, then merge consecutive hours into runs
+    d = np.flatnonzero(same_meter & (step == 0))
+    dup_ns, dup_codes = ns[d], codes[d]
+    new_hour = np.ones(len(d), dtype=bool)
+    new_hour[1:] = (dup_ns[1:] != dup_ns[:-1]) | (dup_codes[1:] != dup_codes[:-1])
+    hour_starts = np.flatnonzero(new_hour)
+    extra = np.diff(np.append(hour_starts, len(d)))
+    hour_ns, hour_codes = dup_ns[hour_starts], dup_codes[hour_starts]
+    new_run = np.ones(len(hour_ns), dtype=bool)
+    new_run[1:] = (np.diff(hour_ns) != HOUR) | (hour_codes[1:] != hour_codes[:-1])
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.append(run_starts[1:], len(hour_ns))[:len(run_starts)] - 1
+    dups = pd.DataFrame({
+        'start': to_timestamps(hour_ns[run_starts], dates.tz),
+        'end': to_timestamps(hour_ns[run_ends], dates.tz),
+        'hours': run_ends - run_starts + 1,
+        'extra_rows': np.add.reduceat(extra, run_starts) if len(run_starts) else np.zeros(0, dtype=int),
+    })
+    if meters is not None:
+        gaps.insert(0, 'meter', names[codes[g]])
+        dups.insert(0, 'meter', names[hour_codes[run_starts]])
+    return gaps, dups
+
+
+def missing_days(gaps):
+    '''
+    List the local days touched by gaps, e.g. for scrape_data.py --gap-fill
+
+    :param gaps: Gaps from find_gaps
+    :returns: Sorted array of 'YYYY-MM-DD' strings
+    '''
+    first = gaps['start'].dt.tz_localize(None).dt.normalize().to_numpy().astype('datetime64[D]').astype(np.int64)
+    last = gaps['end'].dt.tz_localize(None).dt.normalize().to_numpy().astype('datetime64[D]').astype(np.int64)
+    counts = last - first + 1
+    days = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    return np.unique(days).astype('datetime64[D]').astype(str)
+
+
+def report_gaps(gaps, dups):
+    '''
+    Print gaps and duplicates as one line per range of hours
+    '''
+    def label(row):
+        meter = '{} | '.format(row['meter']) if 'meter' in row else ''
+        if row['start'] == row['end']:
+            return '{}{:%Y-%m-%d %H:%M}'.format(meter, row['start'])
+        return '{}{:%Y-%m-%d %H:%M} to {:%Y-%m-%d %H:%M}'.format(meter, row['start'], row['end'])
+    if not gaps.empty:
+        print('Missing data for {} hours in {} ranges:'.format(gaps['hours'].sum(), len(gaps)))
+        for _, row in gaps.iterrows():
+            print('\t{} ({} hours)'.format(label(row), row['hours']))
+    if not dups.empty:
+        print('Duplicated data for {} hours in {} ranges:'.format(dups['hours'].sum(), len(dups)))
+        for _, row in dups.iterrows():
+            print('\t{} ({} hours, {} extra rows)'.format(label(row), row['hours'], row['extra_rows']))
@@ -0,0 +1,125 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Downloaded dates index
+# Purpose:      Keep track of which days of usage data have already been downloaded
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import json
+import threading
+from datetime import datetime, date, timedelta
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from ingest import file_date
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+
+def download_finished(f_path):
+    '''
+    Check if a file in a download folder is complete - Firefox creates an empty placeholder plus a .part file while downloading
+    '''
+    return os.path.isfile(f_path) and os.path.getsize(f_path) > 0 and not os.path.exists(f_path + '.part')
+
+
+def as_date(value):
+    '''
+    Convert a datetime or pandas Timestamp into a plain date, leaving dates as they are
+    '''
+    return value.date() if isinstance(value, datetime) else value
+
+
+class DownloadIndex(object):
+    '''
+    In-memory set of the days downloaded into the outputs folder, persisted to a small JSON sidecar file
+
+    The sidecar maps each downloaded file name to the day it covers. It is trusted as long as it is newer than the
+    outputs folder, otherwise the folder is scanned once to rebuild it. Checking whether a day has been downloaded is
+    then a set lookup rather than a scan and parse of every file name. The index can be shared between threads.
+
+    :param outputs_dir: Folder the scraper downloads data into
+    :param index_filepath: Path of the sidecar file
+    :returns: None
+    '''
+
+    def __init__(self, outputs_dir, index_filepath):
+        self.outputs_dir = outputs_dir
+        self.index_filepath = index_filepath
+        self.files = {}
+        self.dates = set()
+        self.lock = threading.RLock()
+        if os.path.isfile(self.index_filepath) and os.path.getmtime(self.index_filepath) >= os.path.getmtime(self.outputs_dir):
+            with open(self.index_filepath) as f:
+                self.files = {name: date.fromisoformat(day) for name, day in json.load(f).items()}
+            self.dates = set(self.files.values())
+        else:
+            self.refresh()
+
+    def __contains__(self, value):
+        return as_date(value) in self.dates
+
+    def __len__(self):
+        return len(self.dates)
+
+    def latest(self):
+        '''
+        Get the most recent day downloaded, or None if nothing has been downloaded yet
+        '''
+        return max(self.dates) if self.dates else None
+
+    def missing_days(self, start=None, end=None):
+        '''
+        List the days in a range that have not been downloaded
+
+        :param start: Optional first day of the range, defaults to the earliest day downloaded
+        :param end: Optional last day of the range, defaults to the latest day downloaded
+        :returns: Sorted list of dates
+        '''
+        if not self.dates and (start is None or end is None):
+            return []
+        start = as_date(start) if start is not None else min(self.dates)
+        end = as_date(end) if end is not None else max(self.dates)
+        return [start + timedelta(days=i) for i in range((end - start).days + 1) if start + timedelta(days=i) not in self.dates]
+
+    def add(self, filename):
+        '''
+        Record a downloaded file, ignoring names that are not in the expected format
+
+        :param filename: Name of the file in the outputs folder
+        :returns: The day the file covers, or None if the name is not recognised
+        '''
+        f_date = file_date(filename)
+        if f_date is None:
+            return None
+        with self.lock:
+            self.files[filename] = f_date.date()
+            self.dates.add(f_date.date())
+        return f_date.date()
+
+    def refresh(self):
+        '''
+        Pick up any files in the outputs folder that are not in the index yet and save the index if anything changed
+
+        :returns: List of days that were newly added
+        '''
+        added = []
+        with self.lock:
+            for f in os.listdir(self.outputs_dir):
+                if f not in self.files and download_finished(os.path.join(self.outputs_dir, f)):
+                    f_date = self.add(f)
+                    if f_date is not None:
+                        added.append(f_date)
+            if added or not os.path.isfile(self.index_filepath):
+                self.save()
+        return added
+
+    def save(self):
+        '''
+        Write the index to the sidecar file
+        '''
+        with self.lock:
+            with open(self.index_filepath, 'w') as f:
+                json.dump({name: day.isoformat() for name, day in self.files.items()}, f, indent=1, sort_keys=True)
@@ -0,0 +1,123 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Electricity data HTTP download
+# Purpose:      Fetch daily usage CSVs straight from the portal's export endpoint using a logged-in session
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import traceback
+import requests
+from requests.cookies import create_cookie
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from ingest import usage_filename
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+# every usage CSV starts with this header - anything else, like a login page after the session expires, is not usage data
+USAGE_HEADER = b'date,usage'
+
+
+class HttpDownloader(object):
+    '''
+    Pooled HTTP session that downloads daily usage CSVs from the portal's consumption export endpoint
+
+    The browser is only needed to log in - its cookies are copied into this session, after which many days can be
+    fetched concurrently and written to the outputs folder with the same names the browser download would use.
+
+    :param export_url: URL template for the export endpoint with a {date} placeholder, e.g. https://portal/export?date={date}
+    :param outputs_dir: Folder to write the downloaded files into
+    :param cookies: Optional list of cookie dicts as returned by Selenium's driver.get_cookies()
+    :param headers: Optional dict of extra headers to send with every request, e.g. the browser's User-Agent
+    :param workers: Optional number of concurrent requests, also the size of the connection pool
+    :param date_format: Optional strftime format used to fill the {date} placeholder
+    :param timeout: Optional length of time to wait for each response in seconds
+    :returns: None
+    '''
+
+    def __init__(self, export_url, outputs_dir, cookies=None, headers=None, workers=4, date_format='%Y-%m-%d', timeout=60):
+        self.export_url = export_url
+        self.outputs_dir = outputs_dir
+        self.workers = workers
+        self.date_format = date_format
+        self.timeout = timeout
+        # pooled session with retries on transient errors and rate limiting
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        for cookie in cookies if cookies else []:
+            # Selenium gives host-only cookies a bare domain like 'localhost', which the cookie jar never matches - leave
+            # the domain out for those and keep it for domain cookies, which start with a dot
+            domain = cookie.get('domain', '')
+            self.session.cookies.set_cookie(create_cookie(cookie['name'], cookie['value'], domain=domain if domain.startswith('.') else '', path=cookie.get('path', '/'), secure=cookie.get('secure', False)))
+
+    def fetch(self, day):
+        '''
+        Download the usage file for a single day
+
+        :param day: date or datetime of the day to fetch
+        :returns: Name of the file written, or None if the portal has no data for that day
+        :raises requests.HTTPError: Raised when the portal responds with an error other than 404
+        :raises ValueError: Raised when the response is not a usage CSV, e.g. a login page once the session has expired
+        '''
+        response = self.session.get(self.export_url.format(date=day.strftime(self.date_format)), timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        content = response.content.lstrip(b'\xef\xbb\xbf \t\r\n')
+        if not content:
+            return None
+        if not content.startswith(USAGE_HEADER):
+            raise ValueError('Response for {:%Y-%m-%d} is not a usage CSV - the session may have expired'.format(day))
+        # write to a temporary name first so a partial file is never picked up as a completed download
+        filename = usage_filename(day)
+        f_path = os.path.join(self.outputs_dir, filename)
+        with open(f_path + '.part', 'wb') as f:
+            f.write(response.content)
+        os.replace(f_path + '.part', f_path)
+        return filename
+
+    def fetch_range(self, days, downloads=None, refetch=False):
+        '''
+        Download many days concurrently, skipping any already downloaded
+
+        :param days: Iterable of dates or datetimes to fetch
+        :param downloads: Optional DownloadIndex of days already downloaded, updated as files are written
+        :param refetch: Optional flag to download days again even if they are in downloads, replacing their files
+        :returns: Tuple of (list of days downloaded, dict mapping failed days to their error message)
+        '''
+        days = [day for day in days if downloads is None or refetch or day not in downloads]
+        fetched = []
+        failed = {}
+        print('Fetching {} days with {} concurrent requests...'.format(len(days), self.workers))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch, day): day for day in days}
+            for future in as_completed(futures):
+                day = futures[future]
+                try:
+                    filename = future.result()
+                except Exception as e:
+                    print('Failed downloading data for {:%Y-%m-%d}!'.format(day))
+                    traceback.print_exc()
+                    failed[day] = str(e)
+                    continue
+                if filename is None:
+                    print('No data available for {:%Y-%m-%d}'.format(day))
+                    continue
+                if downloads is not None:
+                    downloads.add(filename)
+                fetched.append(day)
+                print('Downloaded data for {:%Y-%m-%d}'.format(day))
+        if downloads is not None and fetched:
+            downloads.save()
+        return sorted(fetched), failed
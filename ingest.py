@@ -0,0 +1,136 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Electricity data ingest
+# Purpose:      Read and parse the daily usage CSV files downloaded by the scraper
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import re
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+TIMEZONE = 'Pacific/Auckland'
+DATE_FORMAT = '%I:%M%p %d %B %Y'  # date format like this 12:00AM 6th May 2023 once the ordinal is removed
+ORDINAL_REGEX = r'(?<=\d)st|nd|rd|th(?= [a-zA-Z])'
+FILENAME_REGEX = re.compile(r'^.*59PM ([\w ]*).csv$')  # downloaded files end with the day they cover, e.g. ...to 11_59PM 6th May 2023.csv
+
+
+def parse_usage_file(f_path):
+    '''
+    Read a single daily usage CSV file and convert the date column into naive timestamps
+
+    :param f_path: Path to the CSV file
+    :returns: pandas DataFrame with the file contents
+    '''
+    new_data = pd.read_csv(f_path)
+    new_data['date'] = pd.to_datetime(new_data['date'].str.replace(ORDINAL_REGEX, '', regex=True), format=DATE_FORMAT)
+    return new_data
+
+
+def localize(data):
+    '''
+    Convert the naive date column into timezone aware timestamps, inferring the repeated hour at the end of daylight savings
+
+    :param data: pandas DataFrame with a naive 'date' column in chronological order
+    :returns: New DataFrame with a timezone aware 'date' column
+    '''
+    return data.set_index('date').tz_localize(tz=TIMEZONE, ambiguous='infer').reset_index()
+
+
+def parse_and_localize(f_path):
+    '''
+    Read a single daily usage CSV file and convert the date column into timezone aware timestamps
+
+    :param f_path: Path to the CSV file
+    :returns: pandas DataFrame with the file contents
+    '''
+    return localize(parse_usage_file(f_path))
+
+
+def file_date(filename):
+    '''
+    Get the day covered by a downloaded file from its name
+
+    :param filename: Name of the file, e.g. '12_00AM 6th May 2023 to 11_59PM 6th May 2023.csv'
+    :returns: datetime of the day covered, or None if the name is not in the expected format
+    '''
+    file_match = FILENAME_REGEX.match(filename)
+    if file_match is None:
+        return None
+    # remove st / nd / rd / th
+    cleaned = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', file_match[1])
+    return datetime.strptime(cleaned, '%d %B %Y')
+
+
+def ordinal(day):
+    '''
+    Format a day of the month with its ordinal suffix, e.g. 1st, 2nd, 11th
+    '''
+    suffix = 'th' if 11 <= day % 100 <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    return '{}{}'.format(day, suffix)
+
+
+def usage_filename(day):
+    '''
+    Build the name the portal gives a downloaded file for a day, so file_date can read it back
+
+    :param day: date or datetime of the day covered
+    :returns: File name like '12_00AM 6th May 2023 to 11_59PM 6th May 2023.csv'
+    '''
+    day_str = '{} {:%B %Y}'.format(ordinal(day.day), day)
+    return '12_00AM {0} to 11_59PM {0}.csv'.format(day_str)
+
+
+def list_usage_files(outputs_dir, start=None, end=None):
+    '''
+    Find all files in the outputs folder, optionally only those covering a range of days
+
+    :param outputs_dir: Folder the scraper downloads data into
+    :param start: Optional first day to include
+    :param end: Optional last day to include
+    :returns: Sorted list of file names
+    '''
+    files = sorted(f for f in os.listdir(outputs_dir) if os.path.isfile(os.path.join(outputs_dir, f)))
+    if start is None and end is None:
+        return files
+    selected = []
+    for f in files:
+        f_date = file_date(f)
+        if f_date is None:
+            continue
+        if (start is None or f_date >= start) and (end is None or f_date <= end):
+            selected.append(f)
+    return selected
+
+
+def read_usage_files(outputs_dir, files, workers=None, parser=parse_usage_file, source=False):
+    '''
+    Read and parse many daily usage CSV files in a process pool and combine them with a single concat
+
+    :param outputs_dir: Folder the files are in
+    :param files: List of file names to read
+    :param workers: Optional number of worker processes, defaults to the number of CPUs. Use 1 to parse in this process
+    :param parser: Function taking a file path and returning a DataFrame, must be importable by the worker processes
+    :param source: Optional flag to add a 'source' column holding the name of the file each row came from
+    :returns: pandas DataFrame with the rows of all files, or an empty DataFrame if there are no files
+    '''
+    f_paths = [os.path.join(outputs_dir, f) for f in files]
+    if not f_paths:
+        return pd.DataFrame()
+    workers = workers if workers else os.cpu_count()
+    if workers == 1 or len(f_paths) == 1:
+        frames = [parser(f_path) for f_path in f_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(parser, f_paths, chunksize=max(1, len(f_paths) // (workers * 4))))
+    if source:
+        frames = [frame.assign(source=f) for f, frame in zip(files, frames)]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,141 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Mock consumption portal
+# Purpose:      Local stub of the consumption portal serving canned usage CSVs, for testing and benchmarking the scraper without the real site
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import json
+import argparse
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from ingest import usage_filename, list_usage_files, file_date
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+# pages and scripts of the browser version of the portal
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_portal_static')
+# paths served the portal page - the page's script renders the view for each one
+PAGES = ('/login', '/portal', '/account/products/consumption')
+STATIC_TYPES = {'.html': 'text/html', '.js': 'text/javascript', '.css': 'text/css'}
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    '''
+    Request handler for the mock portal - settings are attached to the server instance, see start_portal
+    '''
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def send_text(self, status, body, content_type='text/plain'):
+        body = body if isinstance(body, bytes) else body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/':
+            self.send_response(302)
+            self.send_header('Location', '/login')
+            self.end_headers()
+            return
+        if url.path in PAGES:
+            return self.send_page()
+        if url.path.startswith('/static/'):
+            return self.send_static(url.path[len('/static/'):])
+        if url.path == '/api/days':
+            return self.send_days()
+        if url.path != '/export':
+            return self.send_text(404, 'not found')
+        # reject requests that don't carry the session cookie, like the real portal would
+        if self.server.session_cookie and self.server.session_cookie not in self.headers.get('Cookie', ''):
+            return self.send_text(401, 'not logged in')
+        try:
+            day = datetime.strptime(parse_qs(url.query)['date'][0], '%Y-%m-%d')
+        except (KeyError, ValueError):
+            return self.send_text(400, 'expected a date=YYYY-MM-DD query')
+        f_path = os.path.join(self.server.canned_dir, usage_filename(day))
+        if not os.path.isfile(f_path):
+            return self.send_text(404, 'no data for {:%Y-%m-%d}'.format(day))
+        with open(f_path, 'rb') as f:
+            body = f.read()
+        # sent as a plain text attachment, which Firefox is set up to save without asking
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Disposition', 'attachment; filename="{}"'.format(usage_filename(day)))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_page(self):
+        # the one page of the portal, with the loading delay and session cookie filled in
+        with open(os.path.join(STATIC_DIR, 'portal.html')) as f:
+            page = f.read()
+        page = page.replace('{{DELAY_MS}}', str(int(self.server.delay * 1000)))
+        if self.server.session_cookie:
+            page = page.replace('<body ', '<body data-session="{}" '.format(self.server.session_cookie))
+        self.send_text(200, page, content_type='text/html')
+
+    def send_static(self, name):
+        f_path = os.path.join(STATIC_DIR, os.path.basename(name))
+        if not os.path.isfile(f_path):
+            return self.send_text(404, 'not found')
+        with open(f_path, 'rb') as f:
+            self.send_text(200, f.read(), content_type=STATIC_TYPES.get(os.path.splitext(f_path)[1], 'text/plain'))
+
+    def send_days(self):
+        # days the portal has data for - 'today' is the day after the latest, so the scraper starts on a day with no data like it does on the real site
+        days = sorted(f_date.date() for f_date in map(file_date, list_usage_files(self.server.canned_dir)) if f_date is not None)
+        today = days[-1] + timedelta(days=1) if days else datetime.now().date()
+        self.send_text(200, json.dumps({'days': [day.isoformat() for day in days], 'today': today.isoformat()}), content_type='application/json')
+
+
+def start_portal(canned_dir, port=0, session_cookie=None, verbose=False, delay=0.0):
+    '''
+    Start the mock portal in a background thread
+
+    Besides the /export endpoint, the portal has browser pages reproducing the elements the scraper looks for - the
+    login form at /login, the account page at /portal and the consumption page at /account/products/consumption,
+    which opens the hourly view of a day directly when given ?view=hourly&date=YYYY-MM-DD.
+
+    :param canned_dir: Folder of daily usage CSVs named like the portal's downloads, served from /export?date=YYYY-MM-DD
+    :param port: Optional port to listen on, defaults to any free port
+    :param session_cookie: Optional 'name=value' cookie that requests must carry, otherwise they get a 401. Logging in on the login page sets it
+    :param verbose: Optional flag to log every request
+    :param delay: Optional time in seconds the pages show their loading screens for
+    :returns: The running server - its base url is 'http://localhost:{}'.format(server.server_port), stop it with server.shutdown()
+    '''
+    server = ThreadingHTTPServer(('localhost', port), PortalHandler)
+    server.canned_dir = canned_dir
+    server.session_cookie = session_cookie
+    server.verbose = verbose
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve canned usage CSVs from a local mock consumption portal')
+    parser.add_argument('canned_dir', help='folder of daily usage CSVs, e.g. a copy of outputs')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    parser.add_argument('--session-cookie', help='name=value cookie that requests must carry')
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds the pages show their loading screens for')
+    args = parser.parse_args()
+    server = start_portal(args.canned_dir, port=args.port, session_cookie=args.session_cookie, verbose=True, delay=args.delay)
+    print('Serving {} at http://localhost:{}/login and http://localhost:{}/export?date=YYYY-MM-DD'.format(args.canned_dir, server.server_port, server.server_port))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
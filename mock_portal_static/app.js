@@ -0,0 +1,158 @@
+// Mock consumption portal - reproduces just the pages and elements the scraper relies on, with a configurable delay
+// standing in for the real portal's loading screens. Served by mock_portal.py.
+'use strict';
+
+const DELAY = Number(document.body.dataset.delay) || 0;
+const SESSION = document.body.dataset.session || 'session=mock';
+const MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December'];
+const app = document.getElementById('app');
+
+function el(tag, attrs, text) {
+    const elem = document.createElement(tag);
+    Object.entries(attrs || {}).forEach(([name, value]) => elem.setAttribute(name, value));
+    if (text !== undefined) {
+        elem.textContent = text;
+    }
+    return elem;
+}
+
+function pause(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+function showLoading(cls, id) {
+    const screen = el('div', id ? {id: id} : {class: cls}, 'Loading...');
+    document.body.appendChild(screen);
+    return screen;
+}
+
+// show a loading screen for the configured delay, like the real portal does between views
+async function loading(cls, id) {
+    const screen = showLoading(cls, id);
+    await pause(DELAY);
+    screen.remove();
+}
+
+// days are handled as YYYY-MM-DD strings so there are no timezone surprises
+function shiftDay(day, days) {
+    const d = new Date(day + 'T00:00:00Z');
+    d.setUTCDate(d.getUTCDate() + days);
+    return d.toISOString().slice(0, 10);
+}
+
+function formatDay(day) {
+    const d = new Date(day + 'T00:00:00Z');
+    return d.getUTCDate() + ' ' + MONTHS[d.getUTCMonth()] + ' ' + d.getUTCFullYear();
+}
+
+function loggedIn() {
+    return document.cookie.split('; ').includes(SESSION);
+}
+
+function renderLogin() {
+    const form = el('form', {id: 'login-form'});
+    form.appendChild(el('label', {for: 'email'}, 'Email'));
+    form.appendChild(el('input', {id: 'email', type: 'email'}));
+    const next = el('button', {id: 'continue', type: 'button'}, 'Continue');
+    form.appendChild(next);
+    app.appendChild(form);
+    next.addEventListener('click', async () => {
+        await loading(null, 'loader');
+        form.replaceChildren(el('label', {for: 'password'}, 'Password'), el('input', {id: 'password', type: 'password'}));
+        const login = el('button', {id: 'next', type: 'button'}, 'Log in');
+        form.appendChild(login);
+        login.addEventListener('click', () => {
+            document.cookie = SESSION + '; path=/';
+            window.location.href = '/portal';
+        });
+    });
+}
+
+function renderHeader() {
+    const header = el('header');
+    header.appendChild(el('span', {class: 'account-switcher-button-name'}, 'Mock Account'));
+    const menu = el('button', {class: 'header-tabs-top-link', type: 'button'}, 'My Account');
+    header.appendChild(menu);
+    const nav = el('nav');
+    header.appendChild(nav);
+    menu.addEventListener('click', () => {
+        nav.replaceChildren(el('a', {href: '/account/products/consumption'}, 'Consumption'));
+    });
+    app.appendChild(header);
+}
+
+async function renderConsumption() {
+    const params = new URLSearchParams(window.location.search);
+    const response = await fetch('/api/days');
+    const portal = await response.json();
+    const available = new Set(portal.days);
+    const tabs = el('div', {class: 'tabs'});
+    ['Monthly', 'Daily', 'Hourly'].forEach(name => tabs.appendChild(el('button', {class: 'electricity-historical-tabs', type: 'button'}, name)));
+    app.appendChild(tabs);
+    const view = el('section');
+    app.appendChild(view);
+    let day = params.get('date') || portal.today;
+
+    // the hourly view is built once and updated in place so elements don't go stale under the scraper
+    function showHourly() {
+        const previous = el('button', {class: 'previous', type: 'button'}, 'Previous');
+        const toggle = el('button', {class: 'toggle', type: 'button'});
+        const next = el('button', {class: 'next', type: 'button'}, 'Next');
+        const controls = el('div', {class: 'date-controls'});
+        controls.append(previous, toggle, next);
+        const body = el('div');
+        view.replaceChildren(controls, body);
+
+        function update() {
+            toggle.textContent = formatDay(day);
+            if (available.has(day)) {
+                const download = el('button', {class: 'download-usage-excel', type: 'button'}, 'Download');
+                download.addEventListener('click', () => {
+                    window.location.href = '/export?date=' + day;
+                });
+                body.replaceChildren(el('div', {class: 'chart-container HOURLY electricity-chart'}, 'Hourly usage for ' + formatDay(day)), download);
+            } else {
+                body.replaceChildren(el('div', {class: 'error-text'}, 'No data available for this day'));
+            }
+        }
+
+        async function step(days) {
+            await loading('loading-portal');
+            day = shiftDay(day, days);
+            update();
+        }
+
+        previous.addEventListener('click', () => step(-1));
+        next.addEventListener('click', () => step(1));
+        update();
+    }
+
+    tabs.lastChild.addEventListener('click', async () => {
+        await loading('loading-portal');
+        showHourly();
+    });
+    if (params.get('view') === 'hourly') {
+        showHourly();
+    }
+}
+
+async function main() {
+    const path = window.location.pathname;
+    if (path === '/login') {
+        return renderLogin();
+    }
+    if (!loggedIn()) {
+        window.location.href = '/login';
+        return;
+    }
+    // the loading screen goes up before anything else so the scraper can't act on a half built page
+    const screen = showLoading('loading-portal');
+    renderHeader();
+    if (path.startsWith('/account/products/consumption')) {
+        await renderConsumption();
+    }
+    await pause(DELAY);
+    screen.remove();
+}
+
+main();
@@ -0,0 +1,169 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Usage rollups
+# Purpose:      Keep daily and monthly totals up to date by recomputing only the days and months that received new data
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import json
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from billing import BILL_COLUMNS, SPLITS
+from tariffs import CHARGES
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+DAY_INDEX = ['year', 'month', 'day']
+MONTH_INDEX = ['year', 'month']
+# same column order as pivot_table gives, so the report CSVs keep their layout
+TOTAL_COLUMNS = sorted(BILL_COLUMNS)
+
+
+def daily_rollup(all_data, by=()):
+    '''
+    Total hourly usage and charges by day
+
+    :param all_data: Classified hourly data with the charge columns added
+    :param by: Optional columns to total separately, e.g. ('meter',)
+    :returns: pandas DataFrame indexed by (*by, year, month, day)
+    '''
+    all_data = all_data.dropna(subset=DAY_INDEX)
+    keys = [all_data[name] for name in by] + [all_data[name].astype('int64') for name in DAY_INDEX]
+    daily = all_data.groupby(keys)[TOTAL_COLUMNS].sum()
+    return daily.sort_index()
+
+
+def monthly_rollup(daily, by=()):
+    '''
+    Total daily rollups by month, with the number of days and percentage splits of use
+
+    :param daily: Daily rollups, see daily_rollup
+    :param by: Optional index levels the daily rollups were totalled separately by
+    :returns: pandas DataFrame indexed by (*by, year, month)
+    '''
+    levels = list(by) + MONTH_INDEX
+    monthly = daily.groupby(level=levels).sum()
+    monthly['days'] = daily.groupby(level=levels).size()
+    for split in SPLITS:
+        monthly['{}_perc'.format(split)] = 100 * monthly['{}_kWh'.format(split)] / monthly['usage_kWh']
+    return monthly
+
+
+def monthly_report(monthly):
+    '''
+    Lay out monthly rollups as the mthly_totals report - one column per month plus the average of every month
+    '''
+    report = monthly.T
+    report['avg'] = report.mean(axis=1)
+    return report
+
+
+class RollupStore(object):
+    '''
+    Daily and monthly rollups kept as Parquet files next to the usage store
+
+    Updating replaces only the days of the months that received new hours and then recomputes those months from their
+    days, so the cost of an update depends on how much data changed rather than on the length of the history. The
+    version of each month of the usage store the rollups were built from is saved with them, so months changed by
+    anything that syncs the store - a scrape, or a compile of only some files - are found and recomputed on the next
+    update. The rollups are priced with a particular plan, so they are rebuilt from scratch when the plan changes.
+
+    :param rollup_dir: Folder to keep the rollups in
+    :returns: None
+    '''
+
+    def __init__(self, rollup_dir):
+        self.rollup_dir = rollup_dir
+        if not os.path.exists(self.rollup_dir):
+            os.makedirs(self.rollup_dir)
+        self.daily_path = os.path.join(self.rollup_dir, 'daily_totals.parquet')
+        self.monthly_path = os.path.join(self.rollup_dir, 'monthly_totals.parquet')
+        self.meta_path = os.path.join(self.rollup_dir, 'rollups.json')
+
+    def read(self, plan=None):
+        '''
+        Load the saved rollups
+
+        :param plan: Optional plan dict the rollups must have been priced with
+        :returns: Tuple of (daily, monthly) DataFrames, or None if there are no usable rollups saved
+        '''
+        if not self.current(plan):
+            return None
+        return pd.read_parquet(self.daily_path), pd.read_parquet(self.monthly_path)
+
+    def current(self, plan=None):
+        '''
+        Check there are saved rollups, optionally priced with a particular plan, without loading them
+
+        :param plan: Optional plan dict the rollups must have been priced with
+        :returns: True if read would return the saved rollups
+        '''
+        if not (os.path.isfile(self.meta_path) and os.path.isfile(self.daily_path) and os.path.isfile(self.monthly_path)):
+            return False
+        if plan is None:
+            return True
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        return meta.get('charges') == self.charges(plan)
+
+    def write(self, daily, monthly, plan, versions=None):
+        '''
+        Save the rollups along with the charges they were priced with and the versions of the store months they were built from
+        '''
+        daily.to_parquet(self.daily_path)
+        monthly.to_parquet(self.monthly_path)
+        with open(self.meta_path, 'w') as f:
+            json.dump({'plan': plan['name'], 'charges': self.charges(plan), 'versions': versions if versions is not None else {}}, f, indent=1)
+
+    def stale_months(self, versions):
+        '''
+        Find the months of the usage store that have changed since the rollups were saved
+
+        :param versions: Versions of the store months now, see UsageStore.versions
+        :returns: Sorted list of (year, month) tuples that were added, rewritten or removed
+        '''
+        saved = {}
+        if os.path.isfile(self.meta_path):
+            with open(self.meta_path) as f:
+                saved = json.load(f).get('versions', {})
+        stale = [key for key in set(saved) | set(versions) if saved.get(key) != versions.get(key)]
+        return sorted(tuple(int(part) for part in key.split('-')) for key in stale)
+
+    def charges(self, plan):
+        # the parts of a plan that change the rollups
+        return {chg: plan[chg] for chg in CHARGES}
+
+    def update(self, all_data, months, plan, versions=None):
+        '''
+        Bring the rollups up to date after some months of hourly data have changed
+
+        :param all_data: Classified hourly data with the charge columns added, covering at least every changed month in full - or every month when the rollups are rebuilt, see current
+        :param months: List of (year, month) tuples that changed, e.g. from stale_months - ignored when the rollups are rebuilt
+        :param plan: Plan dict the hourly data was priced with
+        :param versions: Optional versions of the store months all_data was read from, see UsageStore.versions
+        :returns: Tuple of (daily, monthly) DataFrames
+        '''
+        saved = self.read(plan)
+        if saved is None:
+            print('Building rollups from all hourly data...')
+            daily = daily_rollup(all_data)
+            monthly = monthly_rollup(daily)
+        else:
+            daily, monthly = saved
+            months = sorted(set(months))
+            if not months:
+                return daily, monthly
+            print('Updating rollups for {} changed months...'.format(len(months)))
+            changed = pd.MultiIndex.from_tuples(months, names=MONTH_INDEX)
+            all_data = all_data.dropna(subset=DAY_INDEX)
+            in_months = pd.MultiIndex.from_arrays([all_data['year'].astype('int64'), all_data['month'].astype('int64')]).isin(changed)
+            new_daily = daily_rollup(all_data.loc[in_months])
+            daily = pd.concat([daily.loc[~daily.index.droplevel('day').isin(changed)], new_daily]).sort_index()
+            new_monthly = monthly_rollup(new_daily)
+            monthly = pd.concat([monthly.loc[~monthly.index.isin(changed)], new_monthly]).sort_index()
+        self.write(daily, monthly, plan, versions)
+        return daily, monthly
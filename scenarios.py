@@ -0,0 +1,124 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Load shifting scenarios
+# Purpose:      Price a batch of what-if scenarios that move usage into cheaper tariff periods, all at once
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import itertools
+import numpy as np
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from time_of_use import PERIODS, PERIOD_TABLE, period_codes, rate_table
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+SCENARIO_COLUMNS = ['name', 'source', 'target', 'kwh_per_day', 'fraction', 'days']
+# which days a scenario applies to, as (weekdays, weekends)
+DAY_TYPES = {'all': (True, True), 'weekdays': (True, False), 'weekends': (False, True)}
+# periods that occur on each type of day, indexed by [is_weekend, period code]
+PERIOD_AVAILABLE = np.zeros((2, len(PERIODS)), dtype=bool)
+PERIOD_AVAILABLE[0, PERIOD_TABLE[0]] = True
+PERIOD_AVAILABLE[1, PERIOD_TABLE[1]] = True
+# scenarios priced per block, to bound the memory used by the (scenarios x days) arrays
+CHUNK = 1024
+
+
+def daily_period_kwh(all_data, start=None, end=None):
+    '''
+    Total usage by day and tariff period
+
+    :param all_data: Hourly data with a timezone aware 'date' column and 'usage_kWh', and optionally a 'meter' column
+    :param start: Optional first timestamp to include
+    :param end: Optional last timestamp to include
+    :returns: Tuple of (kWh array of shape (days, periods), boolean array flagging weekend days). With several meters each row is one meter's day
+    '''
+    if start is not None:
+        all_data = all_data.loc[all_data['date'] >= start]
+    if end is not None:
+        all_data = all_data.loc[all_data['date'] <= end]
+    dates = all_data['date']
+    local_day = dates.dt.tz_localize(None).dt.normalize()
+    keys = [all_data['meter'], local_day] if 'meter' in all_data else [local_day]
+    day, days = pd.MultiIndex.from_arrays(keys).factorize()
+    kwh = np.bincount(day * len(PERIODS) + period_codes(dates), weights=all_data['usage_kWh'].to_numpy(), minlength=len(days) * len(PERIODS))
+    weekend = np.asarray(days.get_level_values(-1).dayofweek >= 5)
+    return kwh.reshape(len(days), len(PERIODS)), weekend
+
+
+def read_scenarios(scenarios_filepath):
+    '''
+    Read scenarios from a CSV file with the SCENARIO_COLUMNS - kwh_per_day, fraction and days can be left blank
+
+    Each scenario moves kwh_per_day plus fraction of the usage in the source period to the target period on the days
+    chosen by days ('all', 'weekdays' or 'weekends'), never moving more than the source period used that day.
+
+    :param scenarios_filepath: Path to the CSV file
+    :returns: pandas DataFrame of scenarios
+    '''
+    scenarios = pd.read_csv(scenarios_filepath)
+    return scenarios.reindex(columns=SCENARIO_COLUMNS).fillna({'kwh_per_day': 0.0, 'fraction': 0.0, 'days': 'all'})
+
+
+def scenario_grid(sources, targets, kwh_per_day=(0.0,), fractions=(0.0,), days=('all',)):
+    '''
+    Build every combination of some scenario settings, e.g. to sweep EV charging blocks of 1-20 kWh
+
+    :param sources: Periods to move usage out of
+    :param targets: Periods to move usage into - pairs with the same source and target are left out
+    :param kwh_per_day: Optional kWh a day to move
+    :param fractions: Optional fractions of the source period's usage to move
+    :param days: Optional day types to move usage on, see DAY_TYPES
+    :returns: pandas DataFrame of scenarios
+    '''
+    rows = [combo for combo in itertools.product(sources, targets, kwh_per_day, fractions, days) if combo[0] != combo[1]]
+    grid = pd.DataFrame(rows, columns=SCENARIO_COLUMNS[1:])
+    grid.insert(0, 'name', ['{} to {} {:g} kWh/day {:g}% {}'.format(*row[:3], 100 * row[3], row[4]) for row in rows])
+    return grid
+
+
+def simulate(kwh, weekend, scenarios, plan):
+    '''
+    Price a batch of load shifting scenarios against a plan
+
+    Prices only depend on the kWh in each tariff period, so each scenario comes down to how much it moves between two
+    periods. That is worked out for every scenario and day at once as (scenarios x days) array operations.
+
+    :param kwh: kWh by day and period, see daily_period_kwh
+    :param weekend: Weekend flag of each day, see daily_period_kwh
+    :param scenarios: pandas DataFrame of scenarios, see read_scenarios
+    :param plan: Plan dict from tariffs.load_plans
+    :returns: pandas DataFrame with a row per scenario adding moved_kWh, usage_charge, daily_charge, total_charge, bill (discounted) and saving against the current usage
+    :raises ValueError: Raised when a scenario names an unknown period or day type
+    '''
+    unknown = set(scenarios['source']).union(scenarios['target']).difference(PERIODS)
+    if unknown:
+        raise ValueError('Unknown periods {} - choose from {}'.format(', '.join(sorted(unknown)), ', '.join(PERIODS)))
+    unknown = set(scenarios['days']).difference(DAY_TYPES)
+    if unknown:
+        raise ValueError('Unknown day types {} - choose from {}'.format(', '.join(sorted(unknown)), ', '.join(DAY_TYPES)))
+    rates = rate_table(plan['night_chg'], plan['weekend_chg'], plan['peak_chg'], plan['off_peak_chg'])
+    source = scenarios['source'].map(PERIODS.index).to_numpy()
+    target = scenarios['target'].map(PERIODS.index).to_numpy()
+    block = scenarios['kwh_per_day'].to_numpy(dtype=float)
+    fraction = scenarios['fraction'].to_numpy(dtype=float)
+    day_types = np.array([DAY_TYPES[d] for d in scenarios['days']], dtype=bool).reshape(-1, 2)
+    moved = np.zeros(len(scenarios))
+    for first in range(0, len(scenarios), CHUNK):
+        s = slice(first, first + CHUNK)
+        # days each scenario applies to, and where the target period exists that day
+        applies = np.where(weekend, day_types[s, 1:2], day_types[s, 0:1]) & PERIOD_AVAILABLE[weekend.astype(np.intp)[None, :], target[s, None]]
+        source_kwh = kwh[:, source[s]].T
+        moved[s] = (np.minimum(source_kwh * fraction[s, None] + block[s, None], source_kwh) * applies).sum(axis=1)
+    base_usage_charge = kwh.sum(axis=0) @ rates
+    results = scenarios.reset_index(drop=True).copy()
+    results['moved_kWh'] = moved
+    results['usage_charge'] = base_usage_charge + moved * (rates[target] - rates[source])
+    results['daily_charge'] = len(kwh) * plan['daily_chg']
+    results['total_charge'] = results['usage_charge'] + results['daily_charge']
+    results['bill'] = results['total_charge'] * (1.0 - plan['discount'])
+    results['saving'] = (base_usage_charge + len(kwh) * plan['daily_chg']) * (1.0 - plan['discount']) - results['bill']
+    return results
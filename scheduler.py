@@ -0,0 +1,100 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Scrape scheduler
+# Purpose:      Split a range of days into chunks and scrape them with several workers at once
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import math
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+# never run more than this many browsers against the portal at once
+MAX_WORKERS = 4
+
+
+class RateLimiter(object):
+    '''
+    Spaces out actions shared between threads so they happen at most once every min_interval seconds
+
+    :param min_interval: Minimum time between actions in seconds
+    :returns: None
+    '''
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        '''
+        Block until the next action is allowed
+        '''
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.next_time - now)
+            self.next_time = max(now, self.next_time) + self.min_interval
+        if delay:
+            time.sleep(delay)
+
+
+def split_days(days, chunks):
+    '''
+    Split days into contiguous chunks of similar size, newest first
+
+    :param days: Iterable of dates
+    :param chunks: Number of chunks wanted
+    :returns: List of lists of dates, each sorted newest first
+    '''
+    days = sorted(days, reverse=True)
+    if not days:
+        return []
+    size = math.ceil(len(days) / chunks)
+    return [days[i:i + size] for i in range(0, len(days), size)]
+
+
+def run_parallel(days, workers, run_chunk, min_interval=1.0):
+    '''
+    Scrape disjoint chunks of days with several workers at once
+
+    :param days: Iterable of dates to scrape
+    :param workers: Number of workers wanted, capped at MAX_WORKERS
+    :param run_chunk: Function taking (worker_id, days, limiter) that scrapes its days, calling limiter.wait() before each page load, and returns the number of days downloaded
+    :param min_interval: Optional minimum time in seconds between page loads across all workers
+    :returns: Tuple of (number of days downloaded, dict mapping worker id to its error message for workers that failed)
+    '''
+    chunks = split_days(days, max(1, min(workers, MAX_WORKERS)))
+    if not chunks:
+        print('No days to scrape')
+        return 0, {}
+    limiter = RateLimiter(min_interval)
+    downloaded = 0
+    failed = {}
+    print('Scraping {} days with {} workers...'.format(sum(len(chunk) for chunk in chunks), len(chunks)))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = {pool.submit(run_chunk, worker_id, chunk, limiter): worker_id for worker_id, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            worker_id = futures[future]
+            chunk = chunks[worker_id]
+            try:
+                count = future.result()
+            except (Exception, SystemExit) as e:
+                # a worker giving up shouldn't stop the others
+                print('Worker {} failed scraping {:%Y-%m-%d} to {:%Y-%m-%d}!'.format(worker_id, chunk[-1], chunk[0]))
+                traceback.print_exc()
+                failed[worker_id] = repr(e)
+                continue
+            downloaded += count
+            print('Worker {} finished {:%Y-%m-%d} to {:%Y-%m-%d} - downloaded {} days'.format(worker_id, chunk[-1], chunk[0], count))
+    minutes = (time.perf_counter() - start) / 60
+    print('Downloaded {} days with {} workers in {:.1f} minutes ({:.2f} days per minute)'.format(downloaded, len(chunks), minutes, downloaded / minutes if minutes else 0.0))
+    return downloaded, failed
@@ -8,8 +8,11 @@
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # global imports
 import os
-import re
+import json
+import argparse
+import time
 import traceback
+from functools import partial, wraps
 import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -19,65 +22,127 @@ from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # custom module imports
+from usage_store import UsageStore
+from download_index import DownloadIndex, download_finished
+from ingest import file_date
+from scheduler import run_parallel
+from http_download import HttpDownloader
+from checkpoint import RunCheckpoint
+from timing import StageTimer, StepMetrics, timed_step, append_jsonl, summarise_jsonl, summarise_steps
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # main code
 
 
+# number of times to try each browser step, and the wait before the first retry in seconds - doubles after each failure
+RETRIES = 3
+BACKOFF = 2.0
+# number of browser sessions a run will start before giving up and leaving the rest for the next run
+MAX_SESSIONS = 3
+
+
+class ScrapeError(Exception):
+    '''
+    Raised when a browser step still fails after being retried
+    '''
+
+
 def error_catcher(func):
     '''
-    Error catcher decorator to handle closing down browser properly if an error is encountered
+    Error catcher decorator to retry a browser step with backoff if an error is encountered, raising ScrapeError if it keeps failing
     '''
+    @wraps(func)
     def run_and_catch(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except TimeoutException:
-            print('{} method timed out waiting for an element!'.format(func.__name__))
-            traceback.print_exc()
-        except NoSuchElementException:
-            print('{} method could not find an element!'.format(func.__name__))
-            traceback.print_exc()
-        except Exception:
-            print('{} method caused an unexpected error!'.format(func.__name__))
-            traceback.print_exc()
-        # make sure to close web browser instance after error handling if an error is encountered
-        args[0].driver.close()
-        exit()
+        delay = BACKOFF
+        for attempt in range(1, RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except ScrapeError:
+                # a step called by this one has already been retried
+                raise
+            except TimeoutException:
+                print('{} method timed out waiting for an element! (attempt {}/{})'.format(func.__name__, attempt, RETRIES))
+                traceback.print_exc()
+            except NoSuchElementException:
+                print('{} method could not find an element! (attempt {}/{})'.format(func.__name__, attempt, RETRIES))
+                traceback.print_exc()
+            except Exception:
+                print('{} method caused an unexpected error! (attempt {}/{})'.format(func.__name__, attempt, RETRIES))
+                traceback.print_exc()
+            if attempt < RETRIES:
+                time.sleep(delay)
+                delay *= 2
+        raise ScrapeError('{} method failed after {} attempts'.format(func.__name__, RETRIES))
 
     return run_and_catch
 
-@error_catcher
+
 class AutoBrowser(object):
     '''
     Selenium driven instance of Firefox for automatically navigating webpages to scrape data
 
     :param env_filepath: Optional input specifying location of environment file with urls and login info
     :param timeout: Optional input specifying length of time to wait for element to appear in seconds
+    :param headless: Optional input to run Firefox without a visible window
+    :param profile_dir: Optional input specifying a Firefox profile folder to reuse, so the session survives between runs
+    :param download_dir: Optional input specifying a folder for Firefox to download into before files are moved to outputs, so parallel workers don't collide
+    :param downloads: Optional DownloadIndex to share between several browsers
+    :param outputs_dir: Optional input specifying the folder downloads end up in, defaults to outputs next to this script
+    :param metrics: Optional StepMetrics to record the time taken by each step in
+    :param limiter: Optional RateLimiter shared between browsers, waited on before every page load and click
+    :param refetch: Optional flag to download days again even if they have already been downloaded, e.g. to fill gaps within days. Firefox then downloads into a separate folder, so the old file is only replaced once the new one has finished
     :returns: None
     :raises TimeoutException: Raised when a target element does not appear after the configured timeout
     '''
 
-    def __init__(self, env_filepath=None, timeout=60):
+    def __init__(self, env_filepath=None, timeout=60, headless=False, profile_dir=None, download_dir=None, downloads=None, outputs_dir=None, metrics=None, limiter=None, refetch=False):
         # working dir
         self.working_dir = os.path.dirname(__file__)
         # outputs dir
-        self.outputs_dir = os.path.join(self.working_dir, 'outputs')
+        self.outputs_dir = outputs_dir if outputs_dir else os.path.join(self.working_dir, 'outputs')
         if not os.path.exists(self.outputs_dir):
             os.makedirs(self.outputs_dir)
+        # folder firefox saves downloads into
+        self.refetch = refetch
+        if refetch and download_dir is None:
+            download_dir = os.path.join(self.working_dir, 'downloads', 'refetch')
+        self.download_dir = download_dir if download_dir else self.outputs_dir
+        if not os.path.exists(self.download_dir):
+            os.makedirs(self.download_dir)
+        # index of days already downloaded
+        if downloads is None:
+            index_filepath = os.path.join(self.working_dir, 'downloaded_dates.json') if outputs_dir is None else '{}_dates.json'.format(os.path.abspath(self.outputs_dir))
+            downloads = DownloadIndex(self.outputs_dir, index_filepath)
+        self.downloads = downloads
+        # timings of each step, discarded unless a log file is given
+        self.metrics = metrics if metrics else StepMetrics(None)
+        # spaces out page loads across all browsers when scraping in parallel
+        self.limiter = limiter
         # setup downloads location
         options = Options()
         options.set_preference('browser.download.folderList', 2)
         options.set_preference('browser.download.manager.showWhenStarting', False)
-        options.set_preference('browser.download.dir', self.outputs_dir)
+        options.set_preference('browser.download.dir', self.download_dir)
         options.set_preference('browser.download.useDownloadDir', True)
         options.set_preference('browser.download.manager.useWindow', False)
         options.set_preference('browser.helperApps.neverAsk.saveToDisk', 'text/plain')
-        service = Service(os.path.join(self.working_dir, 'geckodriver.exe'))
+        if headless:
+            options.add_argument('-headless')
+        if profile_dir:
+            # reuse a persistent profile so cookies and cache survive between runs
+            if not os.path.exists(profile_dir):
+                os.makedirs(profile_dir)
+            options.add_argument('-profile')
+            options.add_argument(profile_dir)
+        # use the bundled windows driver if it is there, otherwise let selenium find geckodriver
+        driver_filepath = os.path.join(self.working_dir, 'geckodriver.exe')
+        service = Service(driver_filepath) if os.name == 'nt' and os.path.isfile(driver_filepath) else Service()
         # start browser
         print('Starting Firefox...')
-        self.driver = Firefox(service=service, options=options)
+        with self.metrics.step('start_browser', headless=headless):
+            self.driver = Firefox(service=service, options=options)
         self.driver.implicitly_wait(1)
         # hide window off-screen if desired
         # driver.set_window_position(-10000, 0)
@@ -92,20 +157,34 @@ class AutoBrowser(object):
         # assume env file contains login credentials
         self.username = os.getenv('WEB_USERNAME', 'username')
         self.password = os.getenv('WEB_PASSWORD', '1234')
+        # optional url template for the portal's consumption export endpoint, with a {date} placeholder
+        self.export_url = os.getenv('EXPORT_URL')
+        # optional deep link straight to the hourly consumption view
+        self.consumption_url = os.getenv('CONSUMPTION_URL')
+        # optional url template for the hourly consumption view of a particular day, with a {date} placeholder
+        self.consumption_date_url = os.getenv('CONSUMPTION_DATE_URL')
 
         print('Initialised {}!'.format(self.__class__.__name__))
 
+    def pace(self):
+        # wait for the shared rate limiter, if any, before anything that loads a page
+        if self.limiter:
+            self.limiter.wait()
+
     @error_catcher
+    @timed_step
     def login(self, continue_btn_id, login_btn_id, username_fld_id, password_fld_id, load_invisible_id=None, success_visible_cls=None, success_invisible_cls=None):
         # go to login page and wait for login button to appear
         print('Loading login page...')
         self.driver.implicitly_wait(1)
+        self.pace()
         self.driver.get(self.login_url)
         # assume we have a front page that just asks for our username first
         msg = 'button element with id={} was not clickable within {}s'.format(continue_btn_id, self.timeout)
         elem_btn_continue = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button#{}'.format(continue_btn_id))), msg)
         elem_fld_username = self.driver.find_element(by=By.CSS_SELECTOR, value='input#{}'.format(username_fld_id))
         elem_fld_username.send_keys(self.username)
+        self.pace()
         elem_btn_continue.click()
         print('Clicked button {}'.format(elem_btn_continue.text))
         # wait for page to load - target a particular element dissappearing such as splash screen
@@ -117,6 +196,7 @@ class AutoBrowser(object):
         elem_btn_login = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'button#{}'.format(login_btn_id))), msg)
         elem_fld_password = self.driver.find_element(by=By.CSS_SELECTOR, value='input#{}'.format(password_fld_id))
         elem_fld_password.send_keys(self.password)
+        self.pace()
         elem_btn_login.click()
         print('Clicked button {}'.format(elem_btn_login.text))
         print('Logging in...')
@@ -130,89 +210,365 @@ class AutoBrowser(object):
             self.wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, success_invisible_cls)))
         print('Logged in!')
 
+    def save_cookies(self, cookies_filepath):
+        # save the session cookies so a later run can skip logging in
+        with open(cookies_filepath, 'w') as f:
+            json.dump(self.driver.get_cookies(), f, indent=1)
+        print('Saved session cookies')
+
+    @timed_step
+    def restore_session(self, cookies_filepath, success_visible_cls, check_timeout=15, session=None):
+        # load saved session cookies, or the (url, cookies) of a session shared by another browser, and check if they are still valid by opening the page
+        if session is not None:
+            url, cookies = session
+        elif self.consumption_url and os.path.isfile(cookies_filepath):
+            url = self.consumption_url
+            with open(cookies_filepath) as f:
+                cookies = json.load(f)
+        else:
+            return False
+        print('Restoring saved session...')
+        # cookies can only be added for the domain currently loaded
+        self.pace()
+        self.driver.get(url)
+        for cookie in cookies:
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException:
+                # cookies for other domains (e.g. the login provider) can't be restored here
+                pass
+        self.pace()
+        self.driver.get(url)
+        try:
+            WebDriverWait(self.driver, check_timeout).until(EC.visibility_of_all_elements_located((By.CLASS_NAME, success_visible_cls)))
+        except TimeoutException:
+            print('Saved session has expired')
+            return False
+        print('Restored session!')
+        return True
+
     @error_catcher
-    def click_button(self, data_btn_css, hiding_elem_css='wave-portal', i=0):
-        # first make sure hiding element has gone
+    @timed_step
+    def open_consumption(self, hiding_elem_css='loading-portal'):
+        # deep link straight to the hourly consumption view
+        print('Opening consumption page...')
+        if self.driver.current_url != self.consumption_url:
+            self.pace()
+            self.driver.get(self.consumption_url)
         msg = 'element with class={} was not invisible within {}s'.format(hiding_elem_css, self.timeout)
         self.wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, hiding_elem_css)), msg)
-        # wait for a button on the data page to load then click it
-        print('Waiting for button to be clickable...')
-        msg = 'button element targeted by CSS selector={} was not clickable within {}s'.format(data_btn_css, self.timeout)
-        if i==0:
-            # only expecting 1 match, so response will just be the element
-            elem_btn_data = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, data_btn_css)), msg)
-        else:
-            # expecting multiple matches - wait till all visible then select particular one
-            elem_btns = self.wait.until(EC.visibility_of_all_elements_located((By.CSS_SELECTOR, data_btn_css)), msg)
-            elem_btn_data = elem_btns[i]
-        btn_name = elem_btn_data.text
-        elem_btn_data.click()
+
+    @error_catcher
+    def click_button(self, data_btn_css, hiding_elem_css='wave-portal', i=0):
+        with self.metrics.step('click_button', target=data_btn_css):
+            # first make sure hiding element has gone
+            msg = 'element with class={} was not invisible within {}s'.format(hiding_elem_css, self.timeout)
+            self.wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, hiding_elem_css)), msg)
+            # wait for a button on the data page to load then click it
+            print('Waiting for button to be clickable...')
+            msg = 'button element targeted by CSS selector={} was not clickable within {}s'.format(data_btn_css, self.timeout)
+            if i==0:
+                # only expecting 1 match, so response will just be the element
+                elem_btn_data = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, data_btn_css)), msg)
+            else:
+                # expecting multiple matches - wait till all visible then select particular one
+                elem_btns = self.wait.until(EC.visibility_of_all_elements_located((By.CSS_SELECTOR, data_btn_css)), msg)
+                elem_btn_data = elem_btns[i]
+            btn_name = elem_btn_data.text
+            self.pace()
+            elem_btn_data.click()
         print('Clicked button {}'.format(btn_name))
 
+    def displayed_date(self, toggle_btn_css):
+        # read the day currently shown from the toggle button
+        return pd.to_datetime(self.driver.find_element(by=By.CSS_SELECTOR, value=toggle_btn_css).text)
+
     @error_catcher
-    def extract_data(self, toggle_btn_css, previous_btn_css, no_data_css, data_css, download_btn_css):
-        # first wait for the toggle button selecting days to appear
+    @timed_step
+    def goto_date(self, day, toggle_btn_css, previous_btn_css, next_btn_css):
+        # wait for the toggle button showing the current day to appear
         msg = 'button element targeted by CSS selector={} was not clickable within {}s'.format(toggle_btn_css, self.timeout)
-        elem_btn_toggle = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, toggle_btn_css)), msg)
+        self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, toggle_btn_css)), msg)
+        if self.consumption_date_url:
+            # jump straight to the day with a dated url
+            self.pace()
+            self.driver.get(self.consumption_date_url.format(date=day.strftime('%Y-%m-%d')))
+        else:
+            # otherwise step from the day currently shown
+            steps = (self.displayed_date(toggle_btn_css) - day).days
+            for _ in range(abs(steps)):
+                self.click_button(previous_btn_css if steps > 0 else next_btn_css)
+        msg = 'page did not show data for {:%Y-%m-%d} within {}s'.format(day, self.timeout)
+        self.wait.until(lambda driver: self.displayed_date(toggle_btn_css) == day, msg)
 
-        # now check if the no-data element is shown, if so we need to click the back button to go back 1 or 2 days
-        data_found = False
-        while not data_found:
-            try:
-                self.driver.find_element(by=By.CSS_SELECTOR, value=no_data_css)
-                # click the back button to get data from previous day
-                self.click_button(previous_btn_css)
-            except NoSuchElementException:
-                # check if we now have data showing
-                self.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, data_css)))
-                data_found = True
-
-        # check if data already exists in the output folder for this day - only download new data
-        cur_date = pd.to_datetime(elem_btn_toggle.text)
-        downloaded_dates = [pd.to_datetime(re.split(r' to 11[ _]59PM ', f)[1][:-4]) for f in os.listdir(self.outputs_dir) if os.path.isfile(os.path.join(self.outputs_dir, f))]
-        if cur_date not in downloaded_dates:
-            # now to download data for the current day
-            self.click_button(download_btn_css)
-            print('Downloaded data for {:%Y-%m-%d}'.format(cur_date))
+    @error_catcher
+    @timed_step
+    def fetch_date(self, day, toggle_btn_css, previous_btn_css, next_btn_css, no_data_css, data_css, download_btn_css):
+        # go to a particular day and download its data if the portal has any - returns 'downloaded', 'no_data' or 'skipped'
+        day = pd.Timestamp(day).normalize()
+        self.goto_date(day, toggle_btn_css, previous_btn_css, next_btn_css)
+        with self.metrics.step('no_data_check', found=False) as no_data:
+            # the portal shows an error instead of a chart on days it has no data for, e.g. today
+            no_data['found'] = bool(self.driver.find_elements(by=By.CSS_SELECTOR, value=no_data_css))
+        if no_data['found']:
+            print('No data available for {:%Y-%m-%d}'.format(day))
+            return 'no_data'
+        self.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, data_css)))
+        if day in self.downloads and not self.refetch:
+            print('Skipped downloading data for {:%Y-%m-%d}'.format(day))
+            return 'skipped'
+        self.click_button(download_btn_css)
+        self.wait_for_download(day)
+        print('Downloaded data for {:%Y-%m-%d}'.format(day))
+        return 'downloaded'
+
+    @error_catcher
+    def wait_for_download(self, cur_date):
+        # wait for the downloaded file to finish saving into the outputs folder, adding it to the index of downloaded days
+        with self.metrics.step('wait_for_download', scans=0) as scans:
+            msg = 'download for {:%Y-%m-%d} did not complete within {}s'.format(cur_date, self.timeout)
+            WebDriverWait(self.driver, self.timeout, poll_frequency=0.2).until(partial(self.download_complete, cur_date, scans), msg)
+
+    def download_complete(self, cur_date, scans, driver):
+        # scan the download folder once for the file of a day - counts the scans made while waiting
+        scans['scans'] += 1
+        if self.download_dir == self.outputs_dir:
+            self.downloads.refresh()
+            return cur_date in self.downloads
+        # downloading into a separate folder - move the finished file into outputs
+        for f in os.listdir(self.download_dir):
+            f_date = file_date(f)
+            f_path = os.path.join(self.download_dir, f)
+            if f_date is not None and f_date.date() == cur_date.date() and download_finished(f_path):
+                os.replace(f_path, os.path.join(self.outputs_dir, f))
+                self.downloads.add(f)
+                self.downloads.save()
+                return True
+        return False
+
+
+def start_session(browser, cookies_filepath, fresh_login=False, session=None):
+    '''
+    Reuse the saved session if it is still valid, otherwise log in and save the new session
+
+    :param session: Optional (url, cookies) of a session another browser is logged in to, e.g. the main browser for parallel workers. It is used instead of the saved session, and a new login is not saved
+    :returns: True if the saved or shared session was reused
+    '''
+    warm_start = not fresh_login and browser.restore_session(cookies_filepath, success_visible_cls='account-switcher-button-name', session=session)
+    if not warm_start:
+        browser.login(continue_btn_id='continue', login_btn_id='next', username_fld_id='email', password_fld_id='password', load_invisible_id='loader', success_visible_cls='account-switcher-button-name', success_invisible_cls='loading-portal')
+        if session is None:
+            browser.save_cookies(cookies_filepath)
+    return warm_start
+
+
+def navigate_to_usage(browser):
+    '''
+    Go to the hourly consumption view, using the deep link if there is one
+    '''
+    print('Navigating to usage page...')
+    if browser.consumption_url:
+        browser.open_consumption(hiding_elem_css='loading-portal')
+    else:
+        browser.click_button('button.header-tabs-top-link', hiding_elem_css='initialize-loader finished-loader', i=0)
+        browser.click_button('a[href="/account/products/consumption"]', hiding_elem_css='loading-portal')
+        # click the 3rd match for the button class, which is the hourly data button
+        browser.click_button('button.electricity-historical-tabs', hiding_elem_css='loading-portal', i=2)
+
+
+def fetch_days(browser, days, checkpoint=None):
+    '''
+    Go straight to each day in turn and download it
+
+    :param browser: AutoBrowser already on the hourly consumption view
+    :param days: List of days to fetch, ideally newest first
+    :param checkpoint: Optional RunCheckpoint to record progress in - failed days are recorded and skipped rather than stopping the run
+    :returns: Number of days downloaded
+    :raises ScrapeError: Raised when the browser can't get back to the consumption view after a failed day
+    '''
+    downloaded = 0
+    for day in days:
+        start = time.perf_counter()
+        try:
+            status = browser.fetch_date(day, toggle_btn_css='button.toggle', previous_btn_css='button.previous', next_btn_css='button.next', no_data_css='div.error-text', data_css='div.chart-container.HOURLY.electricity-chart', download_btn_css='button.download-usage-excel')
+        except ScrapeError as e:
+            browser.metrics.day(day, 'failed', time.perf_counter() - start)
+            if checkpoint is None:
+                raise
+            print('Failed fetching {:%Y-%m-%d}, will retry it later'.format(day))
+            checkpoint.fail(day, e)
+            # get back to a known page before carrying on
+            navigate_to_usage(browser)
+            continue
+        browser.metrics.day(day, status, time.perf_counter() - start)
+        if status == 'downloaded':
+            downloaded += 1
+        if checkpoint is not None:
+            checkpoint.complete(day)
+    return downloaded
+
+
+def scrape_with_restarts(new_browser, cookies_filepath, checkpoint, days=None, browser=None, session=None):
+    '''
+    Fetch the outstanding days in a checkpoint then retry the failed ones, starting a new browser session if the current one gets stuck
+
+    :param new_browser: Function returning a new AutoBrowser
+    :param cookies_filepath: Path of the saved session cookies
+    :param checkpoint: RunCheckpoint of the run
+    :param days: Optional subset of the run's days to work on, e.g. a worker's chunk. Defaults to all of them
+    :param browser: Optional AutoBrowser already logged in to start with - it is closed when done
+    :param session: Optional (url, cookies) of a session to reuse when starting new browsers, see start_session
+    :returns: Number of days downloaded
+    '''
+    days = set(days) if days is not None else None
+    downloaded = 0
+    for attempt in range(MAX_SESSIONS):
+        try:
+            if browser is None:
+                browser = new_browser()
+                start_session(browser, cookies_filepath, session=session)
+            navigate_to_usage(browser)
+            todo = [day for day in checkpoint.outstanding() if days is None or day in days]
+            downloaded += fetch_days(browser, todo, checkpoint)
+            # failed days are queued until the rest of the range is done
+            retry = [day for day in checkpoint.retry_days() if days is None or day in days]
+            downloaded += fetch_days(browser, retry, checkpoint)
+            break
+        except ScrapeError:
+            print('Browser session failed ({}/{})!'.format(attempt + 1, MAX_SESSIONS))
+            traceback.print_exc()
+        finally:
+            if browser is not None:
+                browser.driver.quit()
+                browser = None
+    return downloaded
+
+
+def scrape_chunk(worker_id, days, limiter, cookies_filepath, downloads, checkpoint, headless=False, metrics=None, session=None):
+    '''
+    Worker for parallel scraping - runs its own browser downloading into its own folder, sharing the index of downloaded days, the run checkpoint, the rate limiter and the main browser's session
+
+    :returns: Number of days downloaded
+    '''
+    download_dir = os.path.join(os.path.dirname(__file__), 'downloads', 'worker-{}'.format(worker_id))
+    new_browser = partial(AutoBrowser, headless=headless, download_dir=download_dir, downloads=downloads, metrics=metrics, limiter=limiter, refetch=checkpoint.refetch)
+    return scrape_with_restarts(new_browser, cookies_filepath, checkpoint, days=days, session=session)
+
+
+def parse_args():
+    '''
+    Parse command line options
+    '''
+    parser = argparse.ArgumentParser(description='Automatically scrape hourly electricity usage data from the web')
+    parser.add_argument('--backend', choices=['browser', 'http'], default='browser', help='download each day through the browser, or log in with the browser then fetch days directly from the EXPORT_URL endpoint')
+    parser.add_argument('--workers', type=int, help='number of concurrent requests for the http backend (default 4), or number of browsers to scrape with at once (default 1)')
+    parser.add_argument('--min-interval', type=float, default=1.0, help='minimum seconds between page loads across all browsers when scraping with several workers')
+    parser.add_argument('--headless', action='store_true', help='run Firefox without a visible window')
+    parser.add_argument('--profile', help='Firefox profile folder to reuse between runs')
+    parser.add_argument('--fresh-login', action='store_true', help='ignore any saved session cookies and log in again')
+    parser.add_argument('--gap-fill', nargs='?', const='index', metavar='MISSING_DATES_CSV', help='only fetch missing days - from a missing_dates.csv written by compile_data.py, or gaps in the downloaded days if no file is given')
+    parser.add_argument('--fresh-run', action='store_true', help='ignore any interrupted run saved in the checkpoint and start a new one')
+    parser.add_argument('--timing-report', action='store_true', help='print average startup timings of past cold-start and warm-start runs, then exit')
+    parser.add_argument('--metrics-report', nargs='?', const='latest', metavar='RUN', help='print per-step and per-day timings of the latest run, or of a particular run id, then exit')
+    return parser.parse_args()
+
+
+def main():
+    # command line options
+    args = parse_args()
+    working_dir = os.path.dirname(__file__)
+    # saved session cookies - these allow access to the account so keep the file private
+    cookies_filepath = os.path.join(working_dir, 'session_cookies.json')
+    # log of startup timings for comparing cold-start and warm-start runs
+    timings_filepath = os.path.join(working_dir, 'startup_timings.jsonl')
+    # progress of the current run so it can be resumed if interrupted
+    checkpoint = RunCheckpoint(os.path.join(working_dir, 'scrape_checkpoint.json'))
+    # log of the time taken by every browser step and every day
+    metrics_filepath = os.path.join(working_dir, 'scrape_metrics.jsonl')
+    if args.timing_report:
+        summarise_jsonl(timings_filepath, 'start')
+        return
+    if args.metrics_report:
+        summarise_steps(metrics_filepath, run=None if args.metrics_report == 'latest' else args.metrics_report)
+        return
+    timer = StageTimer()
+    metrics = StepMetrics(metrics_filepath)
+    # resume an interrupted run if there is one
+    resuming = not args.fresh_run and checkpoint.load()
+    # days with missing hours from compile_data.py already have a file, so gap-filling them means downloading them again
+    refetch = checkpoint.refetch if resuming else args.gap_fill not in (None, 'index')
+    # initialise browser
+    browser = AutoBrowser(headless=args.headless, profile_dir=args.profile, metrics=metrics, refetch=refetch)
+    timer.lap('start browser')
+    if args.backend == 'http' and not browser.export_url:
+        print('EXPORT_URL must be set in the env file to use the http backend!')
+        browser.driver.quit()
+        return
+    # work out which days to fetch, resuming an interrupted run if there is one
+    if resuming:
+        print('Resuming interrupted run - {} days outstanding, {} failed days to retry'.format(len(checkpoint.outstanding()), len(checkpoint.retry_days())))
+    elif args.gap_fill:
+        # only fetching missing data
+        if args.gap_fill == 'index':
+            days = browser.downloads.missing_days()
         else:
-            print('Skipped downloading data for {:%Y-%m-%d}'.format(cur_date))
-
-        # then navigate back 1 day
-        self.click_button(previous_btn_css)
-
-        return cur_date
-
-
-# initialise browser
-browser = AutoBrowser()
-# check the latest date for which we have data
-cur_date = datetime.now()
-stop_date = cur_date - timedelta(days=365)
-regex = re.compile(r'^.*59PM ([\w ]*).csv$')
-for f in os.listdir(browser.outputs_dir):
-    f_path = os.path.join(browser.outputs_dir, f)
-    if os.path.isfile(f_path):
-        file_match = regex.match(f)
-        if file_match is not None:
-            date_str = file_match[1]
-            # Remove st / nd / rd / th
-            cleaned = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)
-            f_date = datetime.strptime(cleaned, '%d %B %Y')
-            if f_date > stop_date:
-                stop_date = f_date
-# do login
-browser.login(continue_btn_id='continue', login_btn_id='next', username_fld_id='email', password_fld_id='password', load_invisible_id='loader', success_visible_cls='account-switcher-button-name', success_invisible_cls='loading-portal')
-# navigate to usage page
-print('Navigating to usage page...')
-browser.click_button('button.header-tabs-top-link', hiding_elem_css='initialize-loader finished-loader', i=0)
-browser.click_button('a[href="/account/products/consumption"]', hiding_elem_css='loading-portal')
-# click the 3rd match for the button class, which is the hourly data button
-browser.click_button('button.electricity-historical-tabs', hiding_elem_css='loading-portal', i=2)
-# extract data
-# use line below to manually specify stop date
-# stop_date = pd.to_datetime('2023-03-05')
-while cur_date > stop_date:
-    cur_date = browser.extract_data(toggle_btn_css='button.toggle', previous_btn_css='button.previous', no_data_css='div.error-text', data_css='div.chart-container.HOURLY.electricity-chart', download_btn_css='button.download-usage-excel')
-
-# finish
-browser.driver.quit()
+            days = set(pd.to_datetime(pd.read_csv(args.gap_fill)['date']).dt.normalize())
+        print('Filling {} missing days'.format(len(days)))
+        checkpoint.start(days, refetch=refetch)
+    else:
+        # check the latest date for which we have data
+        cur_date = datetime.now()
+        stop_date = cur_date - timedelta(days=365)
+        latest_date = browser.downloads.latest()
+        if latest_date is not None:
+            stop_date = max(stop_date, datetime.combine(latest_date, datetime.min.time()))
+        # use line below to manually specify stop date
+        # stop_date = pd.to_datetime('2023-03-05')
+        checkpoint.start(day for day in pd.date_range(start=stop_date.date(), end=cur_date.date(), freq='D') if day not in browser.downloads)
+    # reuse the saved session if it is still valid, otherwise do login
+    try:
+        warm_start = start_session(browser, cookies_filepath, fresh_login=args.fresh_login)
+    except ScrapeError:
+        print('Could not log in! Run saved in the checkpoint for next time')
+        browser.driver.quit()
+        return
+    timer.lap('login')
+    # newest first so stepping between days only ever goes backwards
+    days = checkpoint.outstanding() + checkpoint.retry_days()
+    if args.backend == 'http':
+        # only needed the browser for logging in - fetch the data directly with the session cookies
+        downloader = HttpDownloader(browser.export_url, browser.outputs_dir, cookies=browser.driver.get_cookies(), headers={'User-Agent': browser.driver.execute_script('return navigator.userAgent')}, workers=args.workers if args.workers else 4)
+        browser.driver.quit()
+        timer.lap('navigate')
+        fetched, failed = downloader.fetch_range(days, downloads=browser.downloads, refetch=refetch)
+        for day in days:
+            if day in failed:
+                checkpoint.fail(day, failed[day])
+            else:
+                checkpoint.complete(day)
+    elif args.workers and args.workers > 1:
+        # each worker reuses this browser's session rather than logging in again and rewriting the saved cookies
+        session = (browser.driver.current_url, browser.driver.get_cookies())
+        browser.driver.quit()
+        timer.lap('navigate')
+        run_chunk = partial(scrape_chunk, cookies_filepath=cookies_filepath, downloads=browser.downloads, checkpoint=checkpoint, headless=args.headless, metrics=metrics, session=session)
+        run_parallel(days, args.workers, run_chunk, min_interval=args.min_interval)
+    else:
+        # go straight to each day, starting a new browser session if this one gets stuck
+        new_browser = partial(AutoBrowser, headless=args.headless, profile_dir=args.profile, metrics=metrics, refetch=refetch)
+        scrape_with_restarts(new_browser, cookies_filepath, checkpoint, browser=browser)
+    timer.lap('download')
+    if checkpoint.finish():
+        print('Run complete!')
+    else:
+        print('{} days outstanding and {} failed days saved in the checkpoint for the next run'.format(len(checkpoint.outstanding()), len(checkpoint.failures)))
+    # add the new downloads to the columnar usage store
+    UsageStore(os.path.join(browser.working_dir, 'store')).sync(browser.outputs_dir)
+    timer.lap('store sync')
+    timer.report()
+    summarise_steps(metrics_filepath, run=metrics.run_id)
+    append_jsonl(timings_filepath, dict(timer.as_dict(), start='warm' if warm_start else 'cold', headless=args.headless, backend=args.backend, time=datetime.now().isoformat()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Tariff plans
+# Purpose:      Load retailer plan definitions and price hourly usage against many plans at once
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import json
+import numpy as np
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from time_of_use import PERIODS, period_codes, rate_table
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+CHARGES = ('daily_chg', 'night_chg', 'peak_chg', 'off_peak_chg', 'weekend_chg')
+
+
+def load_plans(plans_filepath):
+    '''
+    Load plan definitions from a JSON file
+
+    Charges in the file are in cents excluding GST (cents/day for daily_chg, cents/kWh for the rest) as quoted by the
+    retailers, and are converted to NZD including GST here.
+
+    :param plans_filepath: Path to the JSON plans file
+    :returns: Tuple of (list of plan dicts, name of the current plan)
+    '''
+    with open(plans_filepath) as f:
+        spec = json.load(f)
+    gst = spec.get('gst', 0.15)
+    plans = []
+    for plan in spec['plans']:
+        plan = dict(plan)
+        for chg in CHARGES:
+            plan[chg] = (plan[chg] / 100) * (1 + gst)
+        plan['discount'] = plan.get('discount', 0.0)
+        plans.append(plan)
+    return plans, spec.get('current')
+
+
+def select_plan(plans, name):
+    '''
+    Find a plan by name
+
+    :param plans: List of plan dicts from load_plans
+    :param name: Name of the plan
+    :returns: The plan dict
+    :raises KeyError: Raised when there is no plan with that name
+    '''
+    for plan in plans:
+        if plan['name'] == name:
+            return plan
+    raise KeyError('No plan named {} - choose from {}'.format(name, ', '.join(p['name'] for p in plans)))
+
+
+def rate_matrix(plans):
+    '''
+    Stack the per-kWh rates of many plans into a matrix
+
+    :param plans: List of plan dicts from load_plans
+    :returns: numpy array of shape (number of periods, number of plans)
+    '''
+    return np.column_stack([rate_table(p['night_chg'], p['weekend_chg'], p['peak_chg'], p['off_peak_chg']) for p in plans])
+
+
+def compare_plans(all_data, plans, windows):
+    '''
+    Price hourly usage against every plan at once over one or more time windows
+
+    Period codes are worked out once, then kWh per period for each window is multiplied by the rate matrix of all plans
+    in a single product, so comparing N plans costs about the same as pricing one.
+
+    :param all_data: pandas DataFrame of classified hourly usage with 'date', 'year', 'day_of_year' and 'usage_kWh' columns, and optionally a 'meter' column
+    :param plans: List of plan dicts from load_plans
+    :param windows: Dict mapping a window name to a (start, end) pair of timezone aware timestamps, both inclusive
+    :returns: pandas DataFrame with a row per plan holding kWh, days, charges before discount and the discounted bill for each window, ranked by the bill of the first window
+    '''
+    dates = all_data['date']
+    period = period_codes(dates)
+    usage = all_data['usage_kWh'].to_numpy()
+    day_key = (all_data['year'] * 1000 + all_data['day_of_year']).to_numpy()
+    if 'meter' in all_data:
+        # every meter pays its own daily charge
+        day_key = day_key + pd.factorize(all_data['meter'])[0] * 10**7
+    # kWh per period and number of days with data for each window
+    window_kwh = np.zeros((len(windows), len(PERIODS)))
+    window_days = np.zeros(len(windows))
+    for w, (start, end) in enumerate(windows.values()):
+        mask = ((dates >= start) & (dates <= end)).to_numpy()
+        window_kwh[w] = np.bincount(period[mask], weights=usage[mask], minlength=len(PERIODS))
+        window_days[w] = len(np.unique(day_key[mask]))
+    # price every window against every plan in one product
+    usage_cost = window_kwh @ rate_matrix(plans)
+    daily_cost = np.outer(window_days, [p['daily_chg'] for p in plans])
+    discount = np.array([p['discount'] for p in plans])
+    total_cost = usage_cost + daily_cost
+    bill = total_cost * (1.0 - discount)
+    # tabulate
+    table = pd.DataFrame(index=pd.Index([p['name'] for p in plans], name='plan'))
+    for w, name in enumerate(windows):
+        table['{}_days'.format(name)] = int(window_days[w])
+        table['{}_kWh'.format(name)] = window_kwh[w].sum()
+        table['{}_usage_charge'.format(name)] = usage_cost[w]
+        table['{}_daily_charge'.format(name)] = daily_cost[w]
+        table['{}_total_charge'.format(name)] = total_cost[w]
+        table['{}_bill'.format(name)] = bill[w]
+    first = next(iter(windows))
+    return table.sort_values('{}_bill'.format(first))
@@ -0,0 +1,114 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Time-of-use classification
+# Purpose:      Vectorized classification of hourly usage into tariff periods, rates and kWh buckets
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import numpy as np
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+# period codes - every hour falls into exactly one of these
+NIGHT = 0  # 9pm-7am everyday
+WEEKEND = 1  # 7am-9pm Sat/Sun
+PEAK = 2  # 7am-9am & 5pm-9pm Mon-Fri
+OFF_PEAK = 3  # 9am-5pm Mon-Fri
+PERIODS = ('night', 'weekend', 'peak', 'off_peak')
+
+# lookup tables indexed by hour of the day
+HOURS = np.arange(24)
+NIGHT_HOURS = (HOURS < 7) | (HOURS >= 21)
+PEAK_HOURS = np.isin(HOURS, [7, 8, 17, 18, 19, 20])
+OFF_PEAK_HOURS = (HOURS >= 9) & (HOURS <= 16)
+
+# lookup table indexed by [is_weekend, hour] giving the period code
+PERIOD_TABLE = np.empty((2, 24), dtype=np.int8)
+PERIOD_TABLE[0, OFF_PEAK_HOURS] = OFF_PEAK
+PERIOD_TABLE[0, PEAK_HOURS] = PEAK
+PERIOD_TABLE[1, :] = WEEKEND
+PERIOD_TABLE[:, NIGHT_HOURS] = NIGHT
+
+
+def rate_table(night_chg, weekend_chg, peak_chg, off_peak_chg):
+    '''
+    Build an array of rates indexed by period code
+
+    :param night_chg: Rate charged per kWh for night usage
+    :param weekend_chg: Rate charged per kWh for weekend (non-night) usage
+    :param peak_chg: Rate charged per kWh for weekday peak usage
+    :param off_peak_chg: Rate charged per kWh for weekday off-peak usage
+    :returns: numpy array of rates, one per period code
+    '''
+    return np.array([night_chg, weekend_chg, peak_chg, off_peak_chg], dtype=float)
+
+
+def usage_kwh(usage):
+    '''
+    Convert usage strings like '0.52 kWh' into numbers
+
+    :param usage: pandas Series of usage strings
+    :returns: pandas Series of floats
+    '''
+    return usage.str[:-4].astype(float)
+
+
+def period_codes(dates):
+    '''
+    Classify a series of timezone aware timestamps into period codes
+
+    :param dates: pandas Series of timezone aware timestamps
+    :returns: numpy int8 array of period codes (NIGHT, WEEKEND, PEAK or OFF_PEAK)
+    '''
+    hour = dates.dt.hour.to_numpy()
+    weekend = (dates.dt.dayofweek >= 5).to_numpy()
+    return PERIOD_TABLE[weekend.astype(np.intp), hour]
+
+
+def classify(all_data, night_chg, weekend_chg, peak_chg, off_peak_chg):
+    '''
+    Add date parts, period flags, rates, kWh buckets and usage charges to hourly usage data in a single vectorized pass
+
+    :param all_data: pandas DataFrame with a timezone aware 'date' column and either 'usage' strings like '0.52 kWh' or numeric 'usage_kWh'
+    :param night_chg: Rate charged per kWh for night usage
+    :param weekend_chg: Rate charged per kWh for weekend (non-night) usage
+    :param peak_chg: Rate charged per kWh for weekday peak usage
+    :param off_peak_chg: Rate charged per kWh for weekday off-peak usage
+    :returns: The same DataFrame with the new columns added
+    '''
+    dates = all_data['date'].dt
+    hour = dates.hour.to_numpy()
+    weekend = (dates.dayofweek >= 5).to_numpy()
+    period = PERIOD_TABLE[weekend.astype(np.intp), hour]
+    # add date parts
+    all_data['day'] = dates.day.astype('int64')
+    all_data['month'] = dates.month.astype('int64')
+    all_data['year'] = dates.year.astype('int64')
+    all_data['day_of_year'] = dates.dayofyear.astype('int64')
+    # add columns for night/weekend/peak/off-peak times
+    all_data['night'] = NIGHT_HOURS[hour]
+    all_data['weekend'] = weekend
+    all_data['peak'] = PEAK_HOURS[hour]
+    all_data['off-peak'] = OFF_PEAK_HOURS[hour]
+    # add rates
+    rates = rate_table(night_chg, weekend_chg, peak_chg, off_peak_chg)
+    all_data['rate'] = rates[period]
+    # convert usage in kWh to number unless already done, e.g. when read back from the usage store
+    if 'usage_kWh' not in all_data:
+        all_data['usage_kWh'] = usage_kwh(all_data['usage'])
+    usage = all_data['usage_kWh'].to_numpy()
+    # sort out usage at different times - each hour lands in exactly one bucket
+    buckets = np.zeros((len(usage), len(PERIODS)))
+    buckets[np.arange(len(usage)), period] = usage
+    all_data['night_kWh'] = buckets[:, NIGHT]
+    all_data['weekend_kWh'] = buckets[:, WEEKEND]
+    all_data['peak_kWh'] = buckets[:, PEAK]
+    all_data['off_peak_kWh'] = buckets[:, OFF_PEAK]
+    all_data['weekday_kWh'] = all_data['off_peak_kWh'] + all_data['peak_kWh']
+    # calc charges per kWh
+    all_data['usage_charge'] = all_data['rate'] * all_data['usage_kWh']
+    return all_data
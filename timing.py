@@ -0,0 +1,222 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Stage timing
+# Purpose:      Lightweight wall-clock timing of the stages of a run
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from functools import wraps
+from contextlib import contextmanager
+from collections import defaultdict, Counter
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+
+class StageTimer(object):
+    '''
+    Records how long each stage of a run takes, measured from the end of the previous stage
+
+    :returns: None
+    '''
+
+    def __init__(self):
+        self.stages = []
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, name):
+        '''
+        Mark the end of a stage
+
+        :param name: Name of the stage that just finished
+        :returns: Time taken by the stage in seconds
+        '''
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.stages.append((name, elapsed))
+        self.last = now
+        return elapsed
+
+    def report(self):
+        '''
+        Print the time taken by each stage and the total
+        '''
+        print('Stage timings:')
+        for name, elapsed in self.stages:
+            print('\t{:10.3f}s {}'.format(elapsed, name))
+        print('\t{:10.3f}s total'.format(self.last - self.start))
+
+    def as_dict(self):
+        '''
+        Get the time taken by each stage and the total as a dict
+        '''
+        timings = dict(self.stages)
+        timings['total'] = self.last - self.start
+        return timings
+
+
+def append_jsonl(jsonl_filepath, record):
+    '''
+    Append a record to a JSON-lines log file
+
+    :param jsonl_filepath: Path to the log file, created if it doesn't exist
+    :param record: JSON serialisable dict
+    :returns: None
+    '''
+    with open(jsonl_filepath, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def read_jsonl(jsonl_filepath):
+    '''
+    Read all records from a JSON-lines log file
+
+    :param jsonl_filepath: Path to the log file
+    :returns: List of dicts, empty if the file doesn't exist
+    '''
+    if not os.path.isfile(jsonl_filepath):
+        return []
+    with open(jsonl_filepath) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarise_jsonl(jsonl_filepath, key):
+    '''
+    Print the average of every numeric field in a JSON-lines timing log, grouped by the value of one field
+
+    :param jsonl_filepath: Path to the log file
+    :param key: Name of the field to group records by, e.g. 'start' to compare cold and warm starts
+    :returns: None
+    '''
+    groups = defaultdict(list)
+    for record in read_jsonl(jsonl_filepath):
+        groups[record.get(key)].append(record)
+    if not groups:
+        print('No timings recorded in {}'.format(jsonl_filepath))
+        return
+    for value, records in sorted(groups.items(), key=lambda item: str(item[0])):
+        print('Average timings for {}={} over {} runs:'.format(key, value, len(records)))
+        fields = [name for name, field in records[0].items() if isinstance(field, (int, float)) and not isinstance(field, bool)]
+        for name in fields:
+            values = [r[name] for r in records if name in r]
+            print('\t{:10.3f}s {}'.format(sum(values) / len(values), name))
+
+
+class StepMetrics(object):
+    '''
+    Structured timings of the individual steps of a scrape and of each day fetched, appended to a JSON-lines log as
+    they happen so a run that dies part way through still leaves its metrics behind. Every record carries the run id
+    and the name of the thread that made it, so runs with several workers can be separated. The log can be shared
+    between threads.
+
+    :param jsonl_filepath: Path to the log file, or None to discard the records
+    :param run_id: Optional id shared by every record of a run, defaults to the time the run started
+    :returns: None
+    '''
+
+    def __init__(self, jsonl_filepath, run_id=None):
+        self.jsonl_filepath = jsonl_filepath
+        self.run_id = run_id if run_id else datetime.now().isoformat(timespec='seconds')
+        self.lock = threading.Lock()
+
+    def record(self, kind, **fields):
+        '''
+        Append a record to the log
+
+        :param kind: Type of record, 'step' or 'day'
+        :param fields: JSON serialisable fields of the record
+        :returns: None
+        '''
+        if not self.jsonl_filepath:
+            return
+        record = dict(kind=kind, run=self.run_id, thread=threading.current_thread().name, time=time.time(), **fields)
+        with self.lock:
+            append_jsonl(self.jsonl_filepath, record)
+
+    @contextmanager
+    def step(self, name, **fields):
+        '''
+        Time a block of code as one step, recording whether it finished without raising
+
+        :param name: Name of the step
+        :param fields: Extra fields for the record - the block can add more to the dict it is given
+        :returns: Context manager yielding the dict of extra fields
+        '''
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield fields
+            ok = True
+        finally:
+            self.record('step', step=name, seconds=time.perf_counter() - start, ok=ok, **fields)
+
+    def day(self, day, status, seconds, **fields):
+        '''
+        Record the outcome of fetching one day
+
+        :param day: Date fetched
+        :param status: Outcome, e.g. 'downloaded', 'no_data', 'skipped' or 'failed'
+        :param seconds: Time spent on the day
+        :returns: None
+        '''
+        self.record('day', day='{:%Y-%m-%d}'.format(day), status=status, seconds=seconds, **fields)
+
+
+def timed_step(func):
+    '''
+    Decorator timing each call of a method as a step in the StepMetrics held by its object's metrics attribute
+    '''
+    @wraps(func)
+    def run_and_time(self, *args, **kwargs):
+        metrics = getattr(self, 'metrics', None)
+        if metrics is None:
+            return func(self, *args, **kwargs)
+        with metrics.step(func.__name__):
+            return func(self, *args, **kwargs)
+
+    return run_and_time
+
+
+def summarise_steps(jsonl_filepath, run=None):
+    '''
+    Print per-step and per-day statistics for one run in a StepMetrics log
+
+    :param jsonl_filepath: Path to the log file
+    :param run: Optional run id, defaults to the latest run in the log
+    :returns: Dict of summary figures for the run - days, days_per_minute, day_seconds and mean seconds of each step - or None if the log is empty
+    '''
+    records = read_jsonl(jsonl_filepath)
+    if not records:
+        print('No step metrics recorded in {}'.format(jsonl_filepath))
+        return None
+    run = run if run else records[-1]['run']
+    records = [r for r in records if r['run'] == run]
+    steps = defaultdict(list)
+    failures = Counter()
+    for r in records:
+        if r['kind'] == 'step':
+            steps[r['step']].append(r['seconds'])
+            failures[r['step']] += not r['ok']
+    days = [r for r in records if r['kind'] == 'day']
+    print('Step timings for run {}:'.format(run))
+    print('\t{:>6} {:>6} {:>9} {:>9} {:>10}  {}'.format('calls', 'failed', 'mean', 'max', 'total', 'step'))
+    for name, seconds in sorted(steps.items(), key=lambda item: -sum(item[1])):
+        print('\t{:6d} {:6d} {:8.3f}s {:8.3f}s {:9.3f}s  {}'.format(len(seconds), failures[name], sum(seconds) / len(seconds), max(seconds), sum(seconds), name))
+    summary = {'run': run, 'days': len(days)}
+    summary.update({'{}_seconds'.format(name): sum(seconds) / len(seconds) for name, seconds in steps.items()})
+    if days:
+        # measured from the start of the first day to the end of the last
+        minutes = (max(r['time'] for r in days) - min(r['time'] - r['seconds'] for r in days)) / 60
+        summary['day_seconds'] = sum(r['seconds'] for r in days) / len(days)
+        summary['days_per_minute'] = len(days) / minutes if minutes else 0.0
+        statuses = Counter(r['status'] for r in days)
+        print('{} days ({}) at {:.2f} days per minute, {:.3f}s per day on average'.format(len(days), ', '.join('{} {}'.format(n, status) for status, n in sorted(statuses.items())), summary['days_per_minute'], summary['day_seconds']))
+    return summary
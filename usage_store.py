@@ -0,0 +1,216 @@
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# Name:         Usage store
+# Purpose:      Columnar store of hourly usage partitioned by year and month
+#
+# Author:       james.scouller
+#
+# Created:      17/10/2026
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# global imports
+import os
+import re
+import json
+import pandas as pd
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# custom module imports
+from ingest import TIMEZONE, file_date, list_usage_files, read_usage_files, parse_and_localize
+from time_of_use import period_codes, usage_kwh
+# ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# main code
+
+COLUMNS = ['date', 'usage_kWh', 'period', 'source']
+YEAR_DIR_REGEX = re.compile(r'^year=(\d{4})$')
+MONTH_DIR_REGEX = re.compile(r'^month=(\d{2})$')
+
+
+def to_store_rows(data):
+    '''
+    Convert parsed usage rows into the typed columns kept in the store
+
+    :param data: pandas DataFrame with a timezone aware 'date' column, 'usage' strings and a 'source' column
+    :returns: pandas DataFrame with 'date', 'usage_kWh', 'period' and 'source' columns
+    '''
+    return pd.DataFrame({
+        'date': data['date'],
+        'usage_kWh': usage_kwh(data['usage']),
+        'period': period_codes(data['date']),
+        'source': data['source'].astype(str),
+    })
+
+
+class UsageStore(object):
+    '''
+    Hourly usage kept as one Parquet file per calendar month (local time), laid out as year=YYYY/month=MM/usage.parquet
+
+    Appending only rewrites the months that received new rows, and reads only load the months that overlap the
+    requested range. Rows are kept exactly as downloaded, including any hour a file records twice, so gap detection
+    and totals match a full compile of the same files. A JSON manifest records the size and modification time of
+    each downloaded file that has been added, so syncing with the outputs folder only parses new or changed files.
+
+    :param store_dir: Folder to keep the store in
+    :returns: None
+    '''
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        if not os.path.exists(self.store_dir):
+            os.makedirs(self.store_dir)
+        self.manifest_path = os.path.join(self.store_dir, 'manifest.json')
+
+    def partition_path(self, year, month):
+        '''
+        Get the path of the file holding a month of data
+        '''
+        return os.path.join(self.store_dir, 'year={:04d}'.format(year), 'month={:02d}'.format(month), 'usage.parquet')
+
+    def partitions(self, start=None, end=None):
+        '''
+        List the months held in the store, optionally only those overlapping a range of days
+
+        :param start: Optional first day of the range
+        :param end: Optional last day of the range
+        :returns: Sorted list of (year, month) tuples
+        '''
+        found = []
+        for year_dir in os.listdir(self.store_dir):
+            year_match = YEAR_DIR_REGEX.match(year_dir)
+            if year_match is None:
+                continue
+            for month_dir in os.listdir(os.path.join(self.store_dir, year_dir)):
+                month_match = MONTH_DIR_REGEX.match(month_dir)
+                if month_match is not None and os.path.isfile(self.partition_path(int(year_match[1]), int(month_match[1]))):
+                    found.append((int(year_match[1]), int(month_match[1])))
+        if start is not None:
+            found = [p for p in found if p >= (start.year, start.month)]
+        if end is not None:
+            found = [p for p in found if p <= (end.year, end.month)]
+        return sorted(found)
+
+    def versions(self):
+        '''
+        Get the size and modification time of each month's file, so anything built from the store can tell which months have changed since
+
+        :returns: Dict mapping 'YYYY-MM' to [size, modification time in ns]
+        '''
+        versions = {}
+        for year, month in self.partitions():
+            stat = os.stat(self.partition_path(year, month))
+            versions['{:04d}-{:02d}'.format(year, month)] = [stat.st_size, stat.st_mtime_ns]
+        return versions
+
+    def append(self, rows):
+        '''
+        Add rows to the store, replacing any existing rows from the same source files. Only the months touched are rewritten
+
+        :param rows: pandas DataFrame with the store columns, see to_store_rows
+        :returns: List of (year, month) partitions that were rewritten
+        '''
+        if rows.empty:
+            return []
+        dates = rows['date'].dt
+        written = []
+        for (year, month), new_rows in rows.groupby([dates.year, dates.month]):
+            path = self.partition_path(year, month)
+            if os.path.isfile(path):
+                old_rows = pd.read_parquet(path)
+                new_rows = pd.concat([old_rows.loc[~old_rows['source'].isin(new_rows['source'].unique())], new_rows], ignore_index=True)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            # stable sort keeps duplicated hours in the order they were downloaded
+            new_rows = new_rows.sort_values('date', kind='stable')
+            new_rows[COLUMNS].to_parquet(path, index=False)
+            written.append((year, month))
+        return written
+
+    def remove_sources(self, sources):
+        '''
+        Drop all rows that came from particular files, e.g. because the file was deleted
+
+        :param sources: List of file names
+        :returns: List of (year, month) partitions that were rewritten
+        '''
+        # work out which months a file covers from its name where possible to avoid touching every partition
+        dates = [file_date(f) for f in sources]
+        if any(d is None for d in dates):
+            candidates = self.partitions()
+        else:
+            candidates = sorted(set((d.year, d.month) for d in dates))
+        written = []
+        for year, month in candidates:
+            path = self.partition_path(year, month)
+            if not os.path.isfile(path):
+                continue
+            data = pd.read_parquet(path)
+            keep = ~data['source'].isin(sources)
+            if not keep.all():
+                data.loc[keep].to_parquet(path, index=False)
+                written.append((year, month))
+        return written
+
+    def read(self, start=None, end=None, columns=None, months=None):
+        '''
+        Load rows from the store, reading only the months that overlap the requested range
+
+        :param start: Optional first day to include (local time)
+        :param end: Optional last day to include (local time)
+        :param columns: Optional list of columns to load, defaults to all
+        :param months: Optional list of (year, month) tuples to read only those months
+        :returns: pandas DataFrame sorted by date
+        '''
+        columns = list(columns) if columns else list(COLUMNS)
+        load_columns = columns if 'date' in columns else ['date'] + columns
+        frames = [pd.read_parquet(self.partition_path(year, month), columns=load_columns, memory_map=True) for year, month in self.partitions(start, end) if months is None or (year, month) in months]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        data = pd.concat(frames, ignore_index=True)
+        # trim partial months at either end of the range
+        if start is not None:
+            data = data.loc[data['date'] >= pd.Timestamp(start).normalize().tz_localize(TIMEZONE)]
+        if end is not None:
+            data = data.loc[data['date'] < (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).tz_localize(TIMEZONE)]
+        return data.sort_values('date', kind='stable')[columns].reset_index(drop=True)
+
+    def read_manifest(self):
+        '''
+        Load the manifest of files added to the store
+        '''
+        if not os.path.isfile(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def write_manifest(self, manifest):
+        '''
+        Save the manifest of files added to the store
+        '''
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    def sync(self, outputs_dir, workers=None):
+        '''
+        Bring the store up to date with the outputs folder, parsing only new or changed files
+
+        :param outputs_dir: Folder the scraper downloads data into
+        :param workers: Optional number of worker processes to parse files with
+        :returns: List of (year, month) partitions that were rewritten
+        '''
+        manifest = self.read_manifest()
+        current = {}
+        for f in list_usage_files(outputs_dir):
+            stat = os.stat(os.path.join(outputs_dir, f))
+            current[f] = [stat.st_size, stat.st_mtime_ns]
+        # files that have been removed need their old rows dropped
+        removed = [f for f in manifest if f not in current]
+        # files that are new or have changed need parsing - changed files have their old rows dropped first too
+        fresh = [f for f in current if manifest.get(f) != current[f]]
+        changed = [f for f in fresh if f in manifest]
+        print('Parsing {} new or changed files ({} already in store)...'.format(len(fresh), len(current) - len(fresh)))
+        written = set()
+        if removed or changed:
+            written.update(self.remove_sources(removed + changed))
+        if fresh:
+            parsed = read_usage_files(outputs_dir, fresh, workers=workers, parser=parse_and_localize, source=True)
+            written.update(self.append(to_store_rows(parsed)))
+        if removed or fresh:
+            self.write_manifest(current)
+        return sorted(written)